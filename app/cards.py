@@ -0,0 +1,96 @@
+import html
+import threading
+
+# Styles that used to be repeated inline in every card; injected once with the page CSS
+CARD_CSS = """
+.genre-row { margin-top: 10px; }
+.recommendation-card .movie-desc { margin-top: 12px; color: #DDD; }
+.card-links { margin-top: 10px; }
+.card-btn {
+    display: inline-block;
+    padding: 8px 16px;
+    font-weight: 600;
+    border-radius: 30px;
+    text-decoration: none;
+    margin-right: 10px;
+    transition: transform 0.2s ease, box-shadow 0.2s ease;
+}
+.card-btn:hover { transform: scale(1.05); }
+.card-btn.trailer { background: linear-gradient(135deg, #FF4B4B, #FF9F43); color: white; }
+.card-btn.trailer:hover { box-shadow: 0 0 12px #FF9F43; }
+.card-btn.imdb { background: linear-gradient(135deg, #FFD166, #FF9F43); color: black; }
+.card-btn.imdb:hover { box-shadow: 0 0 12px #FFD166; }
+.card-rating { margin-top: 14px; }
+.rating-badge {
+    display: inline-block;
+    padding: 4px 12px;
+    border-radius: 20px;
+    background: #f5c518;
+    color: black;
+    font-weight: bold;
+    font-size: 0.9rem;
+    margin-right: 12px;
+    box-shadow: 0 0 10px rgba(245, 197, 24, 0.5);
+}
+"""
+
+
+def _text(value, default):
+    if value is None or (isinstance(value, float) and value != value):
+        return default
+    return html.escape(str(value))
+
+
+def render_card(movie, poster_src):
+    # movie: a catalog row (Series or dict) with the recommendation columns
+    title = str(movie['Movie_Title'])
+    genres = ''.join(f"<span class='genre-tag'>{html.escape(g.strip())}</span>"
+                     for g in str(movie.get('Genre', '') or '').split(',') if g.strip())
+    return (
+        "<div class='recommendation-card'>"
+        f"<img src=\"{html.escape(poster_src(movie['Poster_URL']))}\" class='poster' loading='lazy'>"
+        "<div>"
+        f"<div class='movie-title'>{html.escape(title)}</div>"
+        f"<div class='genre-row'>{genres}</div>"
+        f"<p class='movie-desc'>{_text(movie.get('Description'), 'No description available.')}</p>"
+        "<p class='card-links'>"
+        f"<a href=\"{_text(movie.get('YouTube_URL'), '#')}\" target='_blank' class='card-btn trailer'>▶️ Watch Trailer</a>"
+        f"<a href=\"https://www.imdb.com/find?q={html.escape(title.replace(' ', '+'))}\" target='_blank' "
+        "class='card-btn imdb'>⭐ View on IMDb</a>"
+        "</p>"
+        f"<p class='card-rating'><span class='rating-badge'>⭐ {_text(movie.get('Rating'), 'N/A')}/10</span></p>"
+        "</div>"
+        "</div>"
+    )
+
+
+class CardRenderer:
+    """Per-movie card HTML, rendered once per catalog version and reused by id.
+
+    ``version`` should change whenever card content can change (catalog
+    rebuild, new poster thumbnails); the cache is dropped when it does.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._cards = {}
+
+    def card(self, movie_id, lookup, poster_src, version):
+        # lookup(movie_id) is only called on a cache miss
+        with self._lock:
+            if version != self._version:
+                self._cards = {}
+                self._version = version
+            fragment = self._cards.get(movie_id)
+        if fragment is None:
+            fragment = render_card(lookup(movie_id), poster_src)
+            with self._lock:
+                if version == self._version:
+                    self._cards[movie_id] = fragment
+        return fragment
+
+    def grid(self, movie_ids, lookup, poster_src, version):
+        # The whole grid is a single HTML string, emitted with one st.markdown call
+        cards = ''.join(self.card(movie_id, lookup, poster_src, version) for movie_id in movie_ids)
+        return f"<div class='recommendation-grid'>{cards}</div>"
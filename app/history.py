@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+import time
+from array import array
+from collections import deque
+
+# Entries kept per session unless overridden
+DEFAULT_MAXLEN = 50
+
+
+class HistoryEntry:
+    """One recommendation event: the emotion, when it happened and the catalog row ids shown.
+
+    Movie details are resolved from the catalog at render time, so an entry is a
+    few dozen bytes no matter how long the descriptions are.
+    """
+
+    __slots__ = ("emotion", "timestamp", "ids")
+
+    def __init__(self, emotion, ids, timestamp=None):
+        self.emotion = emotion
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.ids = array("l", ids)
+
+
+class HistoryStore:
+    """Optional SQLite persistence for session histories, keyed by session id."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "session TEXT NOT NULL, timestamp REAL NOT NULL, emotion TEXT NOT NULL, ids TEXT NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS history_session ON history (session)")
+        self.conn.commit()
+
+    def load(self, session, limit):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT timestamp, emotion, ids FROM history WHERE session = ? ORDER BY rowid DESC LIMIT ?",
+                (session, limit)).fetchall()
+        return [HistoryEntry(emotion, [int(i) for i in ids.split(",") if i], timestamp)
+                for timestamp, emotion, ids in reversed(rows)]
+
+    def append(self, session, entry, keep):
+        with self.lock:
+            self.conn.execute("INSERT INTO history VALUES (?, ?, ?, ?)",
+                              (session, entry.timestamp, entry.emotion, ",".join(map(str, entry.ids))))
+            # Trim on write so the table stays bounded per session too
+            self.conn.execute(
+                "DELETE FROM history WHERE session = ? AND rowid NOT IN ("
+                "SELECT rowid FROM history WHERE session = ? ORDER BY rowid DESC LIMIT ?)",
+                (session, session, keep))
+            self.conn.commit()
+
+    def clear(self, session):
+        with self.lock:
+            self.conn.execute("DELETE FROM history WHERE session = ?", (session,))
+            self.conn.commit()
+
+
+class SessionHistory:
+    """Ring buffer of the last ``maxlen`` entries for one session, newest last."""
+
+    def __init__(self, maxlen=DEFAULT_MAXLEN, store=None, session=None):
+        self.store = store
+        self.session = session
+        self.entries = deque(store.load(session, maxlen) if store else (), maxlen=maxlen)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, emotion, ids):
+        entry = HistoryEntry(emotion, ids)
+        self.entries.append(entry)
+        if self.store:
+            self.store.append(self.session, entry, self.entries.maxlen)
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+        if self.store:
+            self.store.clear(self.session)
+
+    def pages(self, per_page):
+        return max(1, -(-len(self.entries) // per_page))
+
+    def page(self, number, per_page):
+        # Newest first; pages are numbered from 1
+        newest = list(reversed(self.entries))
+        start = (number - 1) * per_page
+        return [(start + i, entry) for i, entry in enumerate(newest[start:start + per_page], 1)]
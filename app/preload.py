@@ -0,0 +1,130 @@
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recommender.tracing import tracer
+
+
+class Preloader:
+    """Loads heavy backends (imports, models, the index) in one background thread.
+
+    Steps run in registration order after ``start``. ``get(name)`` blocks until
+    that step is done; if the background thread has not reached it yet, the step
+    is taken out of the queue and run right away in the caller, so whichever tab
+    is used first never waits behind the others. ``report`` lists what each step
+    cost and where it ran.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaders = {}
+        self._futures = {}
+        self._report = {}
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preload")
+
+    def add(self, name, load):
+        self._loaders[name] = load
+        self._report[name] = {"step": name, "status": "pending", "seconds": None, "ran_in": None}
+        return self
+
+    def start(self):
+        with self._lock:
+            for name in self._loaders:
+                if name not in self._futures:
+                    self._futures[name] = self._pool.submit(self._run, name, "background")
+        return self
+
+    def record(self, name, seconds, ran_in="startup"):
+        # For costs measured elsewhere, e.g. the app's own top-level imports
+        self._report[name] = {"step": name, "status": "done", "seconds": seconds, "ran_in": ran_in}
+
+    def _run(self, name, ran_in):
+        self._report[name].update(status="running", ran_in=ran_in)
+        start = time.perf_counter()
+        try:
+            with tracer.stage(f"preload.{name}"):
+                value = self._loaders[name]()
+        except Exception:
+            self._report[name].update(status="failed", seconds=time.perf_counter() - start)
+            raise
+        self._report[name].update(status="done", seconds=time.perf_counter() - start)
+        return value
+
+    def get(self, name, timeout=None):
+        with self._lock:
+            future = self._futures.get(name)
+            inline = future is None or future.cancel()
+            if inline:
+                future = Future()
+                self._futures[name] = future
+        if inline:
+            try:
+                future.set_result(self._run(name, "on demand"))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result(timeout=timeout)
+
+    def ready(self, name):
+        future = self._futures.get(name)
+        return future is not None and future.done() and future.exception() is None
+
+    def report(self):
+        return [dict(entry) for entry in self._report.values()]
+
+
+def import_module(name, attribute=None):
+    # Loader that imports a module (and optionally returns one of its attributes)
+    def load():
+        module = importlib.import_module(name)
+        return getattr(module, attribute) if attribute else module
+    return load
+
+
+def load_index():
+    # Importing the recommender pulls in scipy; the index itself may be loaded or built
+    return import_module("recommender.recommend", "get_index")()()
+
+
+def load_textblob():
+    # TextBlob's first polarity call loads its lexicon; do that here too
+    TextBlob = import_module("textblob", "TextBlob")()
+    TextBlob("warm up").sentiment
+    return TextBlob
+
+
+def load_emotion_service(workers=2, max_queue=32):
+    # Imports DeepFace/TensorFlow and builds the model, returning once the service is warm
+    EmotionService = import_module("emotion_detector.inference", "EmotionService")()
+    service = EmotionService(workers=workers, max_queue=max_queue)
+    service.ready.wait()
+    error = service.metrics().get("warmup_error")
+    if error:
+        # The service still starts; requests will surface the same error
+        tracer.event("emotion.warmup_failed", level=logging.WARNING, error=error)
+    return service
+
+
+def app_preloader():
+    # Cheapest and most widely needed first; the DeepFace model last
+    return (Preloader()
+            .add("recommender", load_index)
+            .add("textblob", load_textblob)
+            .add("opencv", import_module("cv2"))
+            .add("emotion", load_emotion_service))
+
+
+if __name__ == "__main__":
+    # Startup report: python -m app.preload
+    preloader = app_preloader()
+    for entry in preloader.report():
+        try:
+            preloader.get(entry["step"])
+        except Exception as e:
+            print(f"❌ {entry['step']}: {e}")
+    for entry in preloader.report():
+        print(f"⏱️ {entry['step']:<12} {entry['status']:<8} {entry['seconds'] or 0:.3f}s")
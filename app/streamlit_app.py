@@ -1,14 +1,23 @@
+import time
+app_imports_started = time.perf_counter()
 import streamlit as st
 import pandas as pd
-from textblob import TextBlob
-import cv2
-from deepface import DeepFace
 import numpy as np
 import os
 import sys
+import uuid
+import queue
+import datetime
 
+# Only light modules here: OpenCV, TextBlob, DeepFace and the recommender load in the background
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from recommender.recommend import recommend_movies
+from recommender.memo import TTLCache
+from cache_posters import load_manifest, MANIFEST_JSON
+from app.cards import CardRenderer, CARD_CSS
+from app.history import SessionHistory, HistoryStore
+from app.preload import app_preloader
+from recommender.tracing import tracer, PROFILERS
+app_imports_seconds = time.perf_counter() - app_imports_started
 
 # Emojis for detected emotion
 emotion_emoji_map = {
@@ -21,11 +30,130 @@ COLORS = {
     "primary": "#FF4B4B", "secondary": "#FF9F43", "accent": "#FFD166",
     "background": "#0E1117", "card": "#1E222A", "text": "#FFFFFF"
 }
-if "history" not in st.session_state:
-    st.session_state.history = []
+
+# Stage timings for the last N reruns show up with ?debug=1 (add &profile=cprofile or pyinstrument)
+DEBUG_REQUESTS = 20
+
+# History: entries kept per session, entries per page, optional SQLite file (MOVIE_HISTORY_DB)
+HISTORY_MAXLEN = int(os.environ.get("MOVIE_HISTORY_MAXLEN", 50))
+HISTORY_PER_PAGE = 5
+HISTORY_DB = os.environ.get("MOVIE_HISTORY_DB")
+
+
+@st.cache_resource(show_spinner=False)
+def get_preloader():
+    # Started on the server's first script run; shared by every session. Holds the
+    # recommender index, TextBlob, OpenCV and the warm DeepFace worker pool.
+    preloader = app_preloader()
+    preloader.record("app imports", app_imports_seconds)
+    return preloader.start()
+
+
+def get_index():
+    # Waits for the background load once; afterwards this is the recommender's cheap check
+    preloader.get("recommender")
+    from recommender.recommend import get_index
+    return get_index()
+
+
+def recommend_movies(emotion, top_n=5):
+    preloader.get("recommender")
+    from recommender.recommend import recommend_movies
+    return recommend_movies(emotion, top_n)
+
+
+@st.cache_resource(show_spinner=False)
+def get_review_caches():
+    # Shared by all sessions: normalized review text -> polarity, (emotion, top_n) -> movies
+    return {
+        "polarity": TTLCache(maxsize=4096, ttl=3600),
+        "recommendations": TTLCache(maxsize=256, ttl=600),
+    }
+
+
+def normalize_review(text):
+    # Runs of whitespace collapse to one space; case is kept, since TextBlob scores ':D' and ':d' differently
+    return " ".join(text.split())
+
+
+def cached_polarity(text):
+    # The normalised text is what gets scored, so the cached value always matches its key
+    key = normalize_review(text)
+    return review_caches["polarity"].get_or_compute(key, lambda: preloader.get("textblob")(key).sentiment.polarity)
+
+
+def cached_recommendations(emotion, top_n=5):
+    # Keyed on the index signature too, so catalog or mapping changes are never served stale
+    key = (emotion, top_n, get_index().signature)
+    return review_caches["recommendations"].get_or_compute(key, lambda: recommend_movies(emotion, top_n))
+
+
+@st.cache_data(show_spinner=False)
+def load_poster_thumbs(manifest_mtime):
+    # Reloaded only when cache_posters.py rewrites the manifest
+    return load_manifest()
+
+
+def poster_src(url):
+    # Serve the local right-sized thumbnail when one exists, else the remote poster
+    thumb = poster_thumbs.get(url)
+    return f"app/static/{thumb}" if thumb else url
+
+
+poster_manifest_mtime = os.path.getmtime(MANIFEST_JSON) if os.path.exists(MANIFEST_JSON) else None
+poster_thumbs = load_poster_thumbs(poster_manifest_mtime)
+
+
+@st.cache_resource(show_spinner=False)
+def get_card_renderer():
+    # Card HTML fragments shared by all sessions, keyed by catalog row id
+    return CardRenderer()
+
+
+def card_version():
+    # Cards depend on the catalog/index and on which poster thumbnails exist
+    return (get_index().signature, poster_manifest_mtime)
+
+
+def card_grid(recommendations):
+    return get_card_renderer().grid(recommendations.index, lambda movie_id: recommendations.loc[movie_id],
+                                    poster_src, card_version())
+
+
+def card_grid_for_ids(movie_ids):
+    results = get_index().results
+    # Ids from a persisted history may predate a catalog rebuild; skip the ones that are gone
+    movie_ids = [movie_id for movie_id in movie_ids if movie_id in results.index]
+    return get_card_renderer().grid(movie_ids, lambda movie_id: results.loc[movie_id], poster_src, card_version())
+
+
+@st.cache_resource(show_spinner=False)
+def get_history_store():
+    return HistoryStore(HISTORY_DB) if HISTORY_DB else None
+
+
+def new_session_history():
+    store = get_history_store()
+    session = None
+    if store:
+        # The session id rides in the URL so a reload picks the same history back up
+        session = st.query_params.get("session") or uuid.uuid4().hex
+        st.query_params["session"] = session
+    return SessionHistory(HISTORY_MAXLEN, store, session)
+
 # Page setup
 st.set_page_config(page_title="🎬 Emotion Recommender", layout="wide", initial_sidebar_state="collapsed")
 
+debug = st.query_params.get("debug") == "1"
+tracer.begin_request("rerun", profile=st.query_params.get("profile") if debug else None)
+
+if "history" not in st.session_state:
+    st.session_state.history = new_session_history()
+
+# Start loading the heavy backends on the first script run, before anyone opens a tab
+preloader = get_preloader()
+review_caches = get_review_caches()
+
 # Inject CSS
 st.markdown(f"""
 <style>
@@ -181,6 +309,9 @@ h4 {{
 }}
 
 
+/* ---------- Card Details ---------- */
+{CARD_CSS}
+
 /* ---------- Floating Emoji Animation ---------- */
 .emoji-float {{
     animation: float 3s ease-in-out infinite;
@@ -214,91 +345,47 @@ tab1, tab2, tab3 = st.tabs(["📷 Use Webcam", "📝 Write Review", "📜 Histor
 with tab1:
     col1, col2 = st.columns([1, 2])
     new_entry = None  # Track whether a new recommendation was added
+    busy = False  # The emotion queue stayed full, so nothing was analysed
 
     with col1:
         image = st.camera_input("Snap a quick selfie to detect your mood 🎥")
         if image is not None:
-            with st.spinner("Analyzing facial expression..."):
+            loading = not preloader.ready("emotion")
+            with st.spinner("Loading the emotion model (first use only)..." if loading
+                            else "Analyzing facial expression..."):
                 file_bytes = np.asarray(bytearray(image.read()), dtype=np.uint8)
-                frame = cv2.imdecode(file_bytes, 1)
-                result = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
-                emotion = result[0]['dominant_emotion']
-                emoji = emotion_emoji_map.get(emotion.lower(), "😐")
+                with tracer.stage("app.decode"):
+                    frame = preloader.get("opencv").imdecode(file_bytes, 1)
+                with tracer.stage("app.emotion"):
+                    emotion_service = preloader.get("emotion")
+                    try:
+                        result = emotion_service.analyze(frame)
+                    except queue.Full:
+                        busy = True
+        if image is not None and busy:
+            st.warning("⏳ The emotion model is busy right now. Please retake your selfie in a moment.")
+        elif image is not None:
+            emotion = result[0]['dominant_emotion']
+            emotion_scores = result[0]['emotion']
+            emoji = emotion_emoji_map.get(emotion.lower(), "😐")
             st.success(f"Detected Emotion: **{emotion.capitalize()}** {emoji}")
+            with st.expander("Inference stats"):
+                st.json(emotion_service.metrics())
 
             with st.spinner("Fetching movie suggestions..."):
-                recommendations = recommend_movies(emotion)
+                # Blend all emotion probabilities rather than only the dominant one
+                with tracer.stage("app.recommend"):
+                    recommendations = recommend_movies(emotion_scores)
                 if recommendations is not None and not recommendations.empty:
-                    new_entry = {
-                        "emotion": emotion.capitalize(),
-                        "emoji": emoji,
-                        "movies": recommendations.to_dict(orient='records')
-                    }
-                    st.session_state.history.append(new_entry)
+                    new_entry = st.session_state.history.add(emotion.lower(), recommendations.index)
 
 with col2:
-    if image is not None:
+    if image is not None and not busy:
         if recommendations is not None and not recommendations.empty:
             st.markdown("### 🍿 Recommended Movies")
-            for idx, row in recommendations.iterrows():
-                st.markdown(f"""
-                    <div class='recommendation-card'>
-                        <img src="{row['Poster_URL']}" class='poster'>
-                        <div>
-                            <div class='movie-title'>{row['Movie_Title']}</div>
-                            <div style='margin-top:10px;'>
-                                {''.join(f"<span class='genre-tag'>{g.strip()}</span>" for g in row['Genre'].split(','))}
-                            </div>
-                            <p class='movie-desc' style="margin-top:12px; color:#DDD; font-size:0.95rem; line-height:1.5;">
-                                {row.get('Description', 'No description available.')}
-                            </p>
-                            <p style="margin-top: 10px;">
-                                <a href="{row['YouTube_URL']}" target="_blank" style="
-                                    display: inline-block;
-                                    padding: 8px 16px;
-                                    background: linear-gradient(135deg, #FF4B4B, #FF9F43);
-                                    color: white;
-                                    font-weight: 600;
-                                    border-radius: 30px;
-                                    text-decoration: none;
-                                    margin-right: 10px;
-                                    transition: transform 0.2s ease, box-shadow 0.2s ease;
-                                " onmouseover="this.style.transform='scale(1.05)'; this.style.boxShadow='0 0 12px #FF9F43';"
-                                onmouseout="this.style.transform='scale(1)'; this.style.boxShadow='none';">
-                                    ▶️ Watch Trailer
-                                </a>
-                                <a href="https://www.imdb.com/find?q={row['Movie_Title'].replace(' ', '+')}" target="_blank" style="
-                                    display: inline-block;
-                                    padding: 8px 16px;
-                                    background: linear-gradient(135deg, #FFD166, #FF9F43);
-                                    color: black;
-                                    font-weight: 600;
-                                    border-radius: 30px;
-                                    text-decoration: none;
-                                    transition: transform 0.2s ease, box-shadow 0.2s ease;
-                                " onmouseover="this.style.transform='scale(1.05)'; this.style.boxShadow='0 0 12px #FFD166';"
-                                onmouseout="this.style.transform='scale(1)'; this.style.boxShadow='none';">
-                                    ⭐ View on IMDb
-                                </a>
-                            </p>
-                            <p style="margin-top: 14px;">
-                                <span style="
-                                    display: inline-block;
-                                    padding: 4px 12px;
-                                    border-radius: 20px;
-                                    background: #f5c518;
-                                    color: black;
-                                    font-weight: bold;
-                                    font-size: 0.9rem;
-                                    margin-right: 12px;
-                                    box-shadow: 0 0 10px rgba(245, 197, 24, 0.5);
-                                ">
-                                    ⭐ {row.get('Rating', 'N/A')}/10
-                                </span>
-                            </p>
-                        </div>
-                    </div>
-                """, unsafe_allow_html=True)
+            with tracer.stage("app.render"):
+                grid = card_grid(recommendations)
+            st.markdown(grid, unsafe_allow_html=True)
 
         else:
             st.warning("No recommendations found. Try a different expression.")
@@ -315,8 +402,8 @@ with tab2:
     if st.button("Analyze Sentiment"):
         if review.strip():
             with st.spinner("Analyzing sentiment..."):
-                blob = TextBlob(review)
-                polarity = blob.sentiment.polarity
+                with tracer.stage("app.polarity"):
+                    polarity = cached_polarity(review)
                 if polarity > 0.1:
                     emotion = "happy"
                 elif polarity < -0.1:
@@ -325,84 +412,20 @@ with tab2:
                     emotion = "neutral"
                 emoji = emotion_emoji_map.get(emotion, "😐")
             st.success(f"Detected Sentiment: **{emotion.capitalize()}** {emoji}")
+            with st.expander("Cache stats"):
+                st.json({name: cache.stats() for name, cache in review_caches.items()})
 
             with st.spinner("Finding movie recommendations..."):
-                recommendations = recommend_movies(emotion)
+                with tracer.stage("app.recommend"):
+                    recommendations = cached_recommendations(emotion)
                 if recommendations is not None and not recommendations.empty:
-                    new_entry = {
-                        "emotion": emotion.capitalize(),
-                        "emoji": emoji,
-                        "movies": recommendations.to_dict(orient='records')
-                    }
-                    st.session_state.history.append(new_entry)
+                    new_entry = st.session_state.history.add(emotion.lower(), recommendations.index)
 
             if recommendations is not None and not recommendations.empty:
                 st.markdown("### 🎬 Top Movie Suggestions")
-                for idx, row in recommendations.iterrows():
-                    like_key = f"text_like_{idx}"
-                    dislike_key = f"text_dislike_{idx}"
-
-                    st.markdown(f"""
-                        <div class='recommendation-card'>
-                            <img src="{row['Poster_URL']}" class='poster'>
-                            <div>
-                                <div class='movie-title'>{row['Movie_Title']}</div>
-                                <div style='margin-top:10px;'>
-                                    {''.join(f"<span class='genre-tag'>{g.strip()}</span>" for g in row['Genre'].split(','))}
-                                </div>
-                                <p class='movie-desc' style="margin-top:12px;">
-                                    {row.get('Description', 'No description available.')}
-                                </p>
-                                <p style="margin-top: 10px;">
-                                    <a href="{row['YouTube_URL']}" target="_blank" style="
-                                        display: inline-block;
-                                        padding: 8px 16px;
-                                        background: linear-gradient(135deg, #FF4B4B, #FF9F43);
-                                        color: white;
-                                        font-weight: 600;
-                                        border-radius: 30px;
-                                        text-decoration: none;
-                                        margin-right: 10px;
-                                        transition: transform 0.2s ease, box-shadow 0.2s ease;
-                                    " onmouseover="this.style.transform='scale(1.05)'; this.style.boxShadow='0 0 12px #FF9F43';"
-                                    onmouseout="this.style.transform='scale(1)'; this.style.boxShadow='none';">
-                                        ▶️ Watch Trailer
-                                    </a>
-                                    <a href="https://www.imdb.com/find?q={row['Movie_Title'].replace(' ', '+')}" target="_blank" style="
-                                        display: inline-block;
-                                        padding: 8px 16px;
-                                        background: linear-gradient(135deg, #FFD166, #FF9F43);
-                                        color: black;
-                                        font-weight: 600;
-                                        border-radius: 30px;
-                                        text-decoration: none;
-                                        transition: transform 0.2s ease, box-shadow 0.2s ease;
-                                    " onmouseover="this.style.transform='scale(1.05)'; this.style.boxShadow='0 0 12px #FFD166';"
-                                    onmouseout="this.style.transform='scale(1)'; this.style.boxShadow='none';">
-                                        ⭐ View on IMDb
-                                    </a>
-                                </p>
-                                <p style="margin-top: 14px;">
-                                    <span style="
-                                        display: inline-block;
-                                        padding: 4px 12px;
-                                        border-radius: 20px;
-                                        background: #f5c518;
-                                        color: black;
-                                        font-weight: bold;
-                                        font-size: 0.9rem;
-                                        margin-right: 12px;
-                                        box-shadow: 0 0 10px rgba(245, 197, 24, 0.5);
-                                    ">
-                                        ⭐ {row.get('Rating', 'N/A')}/10
-                                    </span>
-                                </p>
-                            </div>
-                        </div>
-                    """, unsafe_allow_html=True)
-
-
-                    st.markdown("<hr>", unsafe_allow_html=True)
+                with tracer.stage("app.render"):
+                    grid = card_grid(recommendations)
+                st.markdown(grid, unsafe_allow_html=True)
             else:
                 st.warning("No matching movies found.")
         else:
@@ -416,69 +439,19 @@ with tab3:
         st.session_state.history.clear()
         st.success("Emotion history cleared!")
 
-    if st.session_state.history:
-        for i, entry in enumerate(reversed(st.session_state.history), 1):
-            st.markdown(f"<h4>{i}. {entry['emotion']} {entry['emoji']}</h4>", unsafe_allow_html=True)
-            for movie in entry["movies"]:
-                st.markdown(f"""
-                    <div class='recommendation-card'>
-                        <img src="{movie['Poster_URL']}" class='poster'>
-                        <div>
-                            <div class='movie-title'>{movie['Movie_Title']}</div>
-                            <div style='margin-top:10px;'>
-                                {''.join(f"<span class='genre-tag'>{g.strip()}</span>" for g in movie.get('Genre', '').split(','))}
-                            </div>
-                            <p class='movie-desc' style="margin-top:12px;">
-                                {movie.get('Description', 'No description available.')}
-                            </p>
-                            <p style="margin-top: 10px;">
-                                <a href="{movie.get('YouTube_URL', '#')}" target="_blank" style="
-                                    display: inline-block;
-                                    padding: 8px 16px;
-                                    background: linear-gradient(135deg, #FF4B4B, #FF9F43);
-                                    color: white;
-                                    font-weight: 600;
-                                    border-radius: 30px;
-                                    text-decoration: none;
-                                    margin-right: 10px;
-                                    transition: transform 0.2s ease, box-shadow 0.2s ease;
-                                " onmouseover="this.style.transform='scale(1.05)'; this.style.boxShadow='0 0 12px #FF9F43';"
-                                onmouseout="this.style.transform='scale(1)'; this.style.boxShadow='none';">
-                                    ▶️ Watch Trailer
-                                </a>
-                                <a href="https://www.imdb.com/find?q={movie['Movie_Title'].replace(' ', '+')}" target="_blank" style="
-                                    display: inline-block;
-                                    padding: 8px 16px;
-                                    background: linear-gradient(135deg, #FFD166, #FF9F43);
-                                    color: black;
-                                    font-weight: 600;
-                                    border-radius: 30px;
-                                    text-decoration: none;
-                                    transition: transform 0.2s ease, box-shadow 0.2s ease;
-                                " onmouseover="this.style.transform='scale(1.05)'; this.style.boxShadow='0 0 12px #FFD166';"
-                                onmouseout="this.style.transform='scale(1)'; this.style.boxShadow='none';">
-                                    ⭐ View on IMDb
-                                </a>
-                            </p>
-                            <p style="margin-top: 14px;">
-                                <span style="
-                                    display: inline-block;
-                                    padding: 4px 12px;
-                                    border-radius: 20px;
-                                    background: #f5c518;
-                                    color: black;
-                                    font-weight: bold;
-                                    font-size: 0.9rem;
-                                    margin-right: 12px;
-                                    box-shadow: 0 0 10px rgba(245, 197, 24, 0.5);
-                                ">
-                                    ⭐ {movie.get('Rating', 'N/A')}/10
-                                </span>
-                            </p>
-                        </div>
-                    </div>
-                """, unsafe_allow_html=True)
-            st.markdown("<hr>", unsafe_allow_html=True)
+    history = st.session_state.history
+    if len(history):
+        pages = history.pages(HISTORY_PER_PAGE)
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+        with tracer.stage("app.render_history"):
+            history_html = ''.join(
+                f"<h4>{i}. {entry.emotion.capitalize()} {emotion_emoji_map.get(entry.emotion, '😐')} "
+                f"<small>{datetime.datetime.fromtimestamp(entry.timestamp):%H:%M:%S}</small></h4>"
+                + card_grid_for_ids(entry.ids) + "<hr>"
+                for i, entry in history.page(page, HISTORY_PER_PAGE)
+            )
+        st.markdown(history_html, unsafe_allow_html=True)
+        st.caption(f"Showing page {page} of {pages} · keeping the last {HISTORY_MAXLEN} entries")
     else:
         st.info("No history yet. Use the other tabs to get movie suggestions first!")
 
@@ -489,3 +462,22 @@ st.markdown("""
 Made with ❤️ by the Movie Emotion Team | © 2025
 </div>
 """, unsafe_allow_html=True)
+
+tracer.end_request()
+
+# Hidden debug panel (?debug=1): per-stage breakdown of recent reruns in this process
+if debug:
+    with st.expander("🛠️ Debug: stage timings", expanded=True):
+        recent = tracer.recent(DEBUG_REQUESTS)
+        st.dataframe(pd.DataFrame([
+            {"rerun": i, "total_ms": round(request["ms"], 2), **tracer.breakdown(request)}
+            for i, request in enumerate(reversed(recent), 1)
+        ]))
+        st.json(tracer.snapshot())
+        st.json(list(tracer.events)[-DEBUG_REQUESTS:])
+        st.code(tracer.prometheus(), language="text")
+        if recent and recent[-1]["profile"]:
+            st.code(recent[-1]["profile"], language="text")
+        st.caption(f"Profile a rerun with &profile={'|'.join(PROFILERS)}")
+        st.markdown("**Startup report** (seconds per step, and whether it ran in the background)")
+        st.dataframe(pd.DataFrame(preloader.report()))
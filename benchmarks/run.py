@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.synthetic import make_catalog, make_reviews
+from emotion_detector.synthetic import make_frames
+from recommender import recommend
+
+RESULTS_JSON = os.path.join(os.path.dirname(__file__), "latest.json")
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "movie_benchmarks")
+
+# Metric-name suffixes and whether a bigger number is better
+HIGHER_IS_BETTER = ("_per_s",)
+LOWER_IS_BETTER = ("_ms", "_seconds", "_mb")
+
+
+def latency_stats(seconds):
+    ms = np.asarray(seconds) * 1000
+    total = float(np.sum(seconds))
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "calls_per_s": len(ms) / total if total else 0.0,
+    }
+
+
+def timed_calls(fn, repeats, warmup=3):
+    for _ in range(warmup):
+        fn()
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def catalog_csv(n, seed=0):
+    # Generated once per size and reused by later runs
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"catalog_{n}_{seed}.csv")
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        make_catalog(n, seed).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    return path
+
+
+def bench_index(path):
+    recommend.CATALOG_PATH = path
+    start = time.perf_counter()
+    index = recommend.build_index()
+    seconds = time.perf_counter() - start
+
+    # Separate build under tracemalloc, which would otherwise distort the timing
+    tracemalloc.start()
+    recommend.build_index()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    matrix = index.tfidf_matrix
+    matrix_bytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return {
+        "build_seconds": seconds,
+        "build_peak_mb": peak / 2 ** 20,
+        "matrix_mb": matrix_bytes / 2 ** 20,
+        "affinity_mb": index.affinity.nbytes / 2 ** 20,
+        "terms": int(matrix.shape[1]),
+    }
+
+
+def bench_recommend(repeats):
+    results = {}
+    for emotion in recommend.emotion_genre_map:
+        results[emotion] = latency_stats(timed_calls(lambda: recommend.recommend_movies(emotion), repeats))
+    scores = {"happy": 48.0, "sad": 41.0, "neutral": 6.0, "surprise": 5.0}
+    results["blended"] = latency_stats(timed_calls(lambda: recommend.recommend_movies(scores), repeats))
+    return results
+
+
+def bench_sentiment(n_reviews):
+    from sentiment_analysis.analyze_movies import get_polarity
+
+    reviews = make_reviews(n_reviews)
+    get_polarity(reviews[0])
+    start = time.perf_counter()
+    for review in reviews:
+        get_polarity(review)
+    seconds = time.perf_counter() - start
+    return {"reviews_per_s": n_reviews / seconds, "mean_ms": seconds * 1000 / n_reviews}
+
+
+def bench_deepface(frames, detector_backend="opencv"):
+    try:
+        from deepface import DeepFace
+    except ImportError as e:
+        return {"skipped": f"deepface unavailable: {e}"}
+
+    def analyze(frame):
+        return DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False,
+                                detector_backend=detector_backend)
+
+    # First call builds the model; it is reported separately from steady-state latency
+    start = time.perf_counter()
+    analyze(frames[0])
+    cold = time.perf_counter() - start
+    seconds = []
+    for frame in frames:
+        start = time.perf_counter()
+        analyze(frame)
+        seconds.append(time.perf_counter() - start)
+    stats = latency_stats(seconds)
+    stats["cold_start_seconds"] = cold
+    return stats
+
+
+def load_frames(image_dir, count):
+    if not image_dir:
+        return make_frames(count)
+    import cv2
+    names = sorted(n for n in os.listdir(image_dir) if n.lower().endswith((".jpg", ".jpeg", ".png")))
+    return [cv2.imread(os.path.join(image_dir, n)) for n in names]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeats, n_reviews, n_frames, image_dir=None, skip=()):
+    results = {}
+    for n in sizes:
+        print(f"🎬 Catalog with {n} movies")
+        if "index" in skip and "recommend" in skip:
+            continue
+        # Recommendations are measured against the index just built
+        stats = bench_index(catalog_csv(n))
+        if "index" not in skip:
+            results[f"index/n={n}"] = stats
+        if "recommend" not in skip:
+            for emotion, stats in bench_recommend(repeats).items():
+                results[f"recommend/{emotion}/n={n}"] = stats
+    if "sentiment" not in skip:
+        print(f"📝 Sentiment over {n_reviews} reviews")
+        results["sentiment/textblob"] = bench_sentiment(n_reviews)
+    if "deepface" not in skip:
+        print(f"📷 DeepFace over {n_frames} frames")
+        results["emotion/deepface"] = bench_deepface(load_frames(image_dir, n_frames))
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "sizes": sizes,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def _direction(metric):
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(baseline, current, threshold=0.1):
+    # Returns (name, metric, old, new, change) for every metric that got worse by more than threshold
+    regressions = []
+    for name, new_metrics in current["results"].items():
+        old_metrics = baseline["results"].get(name, {})
+        for metric, new in new_metrics.items():
+            old = old_metrics.get(metric)
+            direction = _direction(metric)
+            if not direction or not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or not old:
+                continue
+            change = (new - old) / old
+            if change * direction < -threshold:
+                regressions.append((name, metric, old, new, change))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recommender, sentiment and emotion paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Synthetic catalog sizes (up to 1000000)")
+    parser.add_argument("--repeats", type=int, default=200, help="Timed calls per emotion")
+    parser.add_argument("--reviews", type=int, default=2000, help="Reviews for the sentiment benchmark")
+    parser.add_argument("--frames", type=int, default=20, help="Frames for the DeepFace benchmark")
+    parser.add_argument("--images", default=None, help="Directory of test images (default: fixed synthetic frames)")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["index", "recommend", "sentiment", "deepface"])
+    parser.add_argument("--out", default=RESULTS_JSON, help="Where to write the JSON results")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change that counts as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        for name, metric, old, new, change in regressions:
+            print(f"❌ {name} {metric}: {old:.4g} -> {new:.4g} ({change:+.1%})")
+        if not regressions:
+            print(f"✅ No regressions beyond {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+
+    report = run(args.sizes, args.repeats, args.reviews, args.frames, args.images, set(args.skip))
+    tmp_path = args.out + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    os.replace(tmp_path, args.out)
+    print(f"✅ Results saved to: {args.out}")
@@ -0,0 +1,100 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# Genre mix roughly like a streaming catalog: 1-3 genres per title, drama and comedy most common
+GENRE_WEIGHTS = {
+    "Drama": 0.22, "Comedy": 0.16, "Action": 0.12, "Thriller": 0.09, "Romance": 0.08,
+    "Horror": 0.06, "Sci-Fi": 0.06, "Adventure": 0.06, "Crime": 0.05, "Mystery": 0.04,
+    "Biography": 0.03, "Animation": 0.03,
+}
+GENRE_COUNTS = [1, 2, 3]
+GENRE_COUNT_WEIGHTS = [0.3, 0.45, 0.25]
+
+# A few topical words per genre so descriptions cluster the way real ones do
+GENRE_WORDS = {
+    "Drama": "family loss grief secret marriage struggle redemption past memory sacrifice",
+    "Comedy": "hilarious misfit wedding road trip prank chaos awkward roommate party",
+    "Action": "mercenary heist explosion chase rogue agent mission weapon assassin fight",
+    "Thriller": "conspiracy stalker hostage deadly pursuit informant trap witness cover",
+    "Romance": "love affair summer heart letter reunion wedding passion first kiss",
+    "Horror": "haunted demon curse possessed cabin ritual creature night terror ghost",
+    "Sci-Fi": "galaxy android future planet alien colony time machine artificial signal",
+    "Adventure": "quest treasure jungle expedition island map journey ancient legend",
+    "Crime": "detective mob gang robbery cartel murder police corrupt trial",
+    "Mystery": "disappearance clue puzzle island inspector secret diary vanished estate",
+    "Biography": "true story life career legend champion musician inventor rise fall",
+    "Animation": "talking animal magical kingdom toy friendship adventure village dragon",
+}
+
+SYLLABLES = ["ka", "lo", "ren", "vi", "tor", "mi", "sa", "del", "an", "os", "ith", "mar", "quin", "bel", "zu"]
+
+# Seeds the shared vocabulary with the real catalog's words when it is available
+REAL_CATALOG = os.path.join(os.path.dirname(__file__), "..", "data", "movies_with_posters.csv")
+
+
+def _common_words():
+    words = "a young man woman must when their after who finds an old world city team new life only".split()
+    if os.path.exists(REAL_CATALOG):
+        text = " ".join(pd.read_csv(REAL_CATALOG)["Description"].dropna()).lower()
+        words += re.findall(r"[a-z]{3,}", text)
+    return np.array(sorted(set(words)))
+
+
+def _rare_words(rng, size):
+    # Names and places: a long Zipf-distributed tail, so vocabulary grows with the catalog
+    parts = rng.integers(0, len(SYLLABLES), size=(size, 3))
+    return np.array(["".join(SYLLABLES[i] for i in row) + str(n) for n, row in enumerate(parts)])
+
+
+def make_catalog(n, seed=0):
+    # Vectorized end to end so a 1M-movie catalog takes seconds, not minutes
+    rng = np.random.default_rng(seed)
+    genres = np.array(list(GENRE_WEIGHTS))
+    weights = np.array(list(GENRE_WEIGHTS.values()))
+    common = _common_words()
+    rare = _rare_words(rng, max(1000, n // 4))
+    topical = [GENRE_WORDS[g].split() for g in genres]
+    topical_len = np.array([len(words) for words in topical])
+    topical_words = np.array([words + [words[0]] * (topical_len.max() - len(words)) for words in topical])
+
+    # Weighted sampling without replacement per movie (Gumbel top-k)
+    keys = np.log(weights) - np.log(-np.log(rng.random((n, len(genres)))))
+    movie_genres = np.argsort(-keys, axis=1)[:, :max(GENRE_COUNTS)]
+    counts = rng.choice(GENRE_COUNTS, size=n, p=GENRE_COUNT_WEIGHTS)
+
+    # ~30% topical words from the movie's genres, ~55% common, ~15% rare names
+    lengths = rng.integers(12, 40, size=n)
+    owner = np.repeat(np.arange(n), lengths)
+    kinds = rng.random(owner.size)
+    genre = movie_genres[owner, (rng.random(owner.size) * counts[owner]).astype(np.int64)]
+    topical_pick = topical_words[genre, (rng.random(owner.size) * topical_len[genre]).astype(np.int64)]
+    rare_pick = rare[np.minimum(rng.zipf(1.3, size=owner.size), len(rare)) - 1]
+    words = np.where(kinds < 0.3, topical_pick,
+                     np.where(kinds < 0.85, common[rng.integers(0, len(common), size=owner.size)], rare_pick))
+
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    descriptions = [" ".join(words[bounds[i]:bounds[i + 1]]).capitalize() + "." for i in range(n)]
+    genre_strings = [", ".join(genres[movie_genres[i, :counts[i]]]) for i in range(n)]
+    title_words = rare[rng.integers(0, len(rare), size=n)]
+
+    return pd.DataFrame({
+        "Movie_Title": [f"{word.capitalize()} {i}" for i, word in enumerate(title_words)],
+        "Genre": genre_strings,
+        "Poster_URL": [f"https://image.tmdb.org/t/p/w500/synthetic{i}.jpg" for i in range(n)],
+        "Description": descriptions,
+        "YouTube_URL": [f"https://www.youtube.com/results?search_query=synthetic+{i}+trailer" for i in range(n)],
+        "Rating": np.round(np.clip(rng.normal(6.5, 1.2, size=n), 1, 10), 1),
+    })
+
+
+def make_reviews(n, seed=0):
+    # Short reviews with a polarity mix close to real user text
+    rng = np.random.default_rng(seed)
+    openers = ["I thought this movie was", "Honestly the film felt", "The story is", "What a", "This was"]
+    adjectives = ["wonderful", "boring", "brilliant", "terrible", "fine", "beautiful", "awful",
+                  "predictable", "inspiring", "okay", "great", "disappointing"]
+    endings = ["and I would watch it again.", "but the ending dragged.", "from start to finish.",
+               "with a cast that tries hard.", "and the music stayed with me."]
+    return [f"{rng.choice(openers)} {rng.choice(adjectives)} {rng.choice(endings)}" for _ in range(n)]
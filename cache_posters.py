@@ -0,0 +1,100 @@
+import os
+import io
+import json
+import hashlib
+import tempfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# PIL, requests and the catalog loader are imported where used: the app only needs load_manifest
+
+# Paths
+BASE_DIR = os.path.dirname(__file__)
+CATALOG_CSV = os.path.join(BASE_DIR, "data", "movies_with_posters.csv")
+STATIC_DIR = os.path.join(BASE_DIR, "app", "static")
+THUMB_DIR = os.path.join(STATIC_DIR, "posters")
+MANIFEST_JSON = os.path.join(BASE_DIR, "data", "poster_thumbs.json")
+
+# Cards show posters at 150x220 CSS px; 2x covers high-DPI screens
+THUMB_SIZE = (300, 440)
+THUMB_QUALITY = 80
+
+
+def load_manifest(path=MANIFEST_JSON):
+    # Poster_URL -> thumbnail path relative to app/static
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, path=MANIFEST_JSON):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def make_thumbnail(data, size=THUMB_SIZE, quality=THUMB_QUALITY):
+    from PIL import Image, ImageOps
+
+    image = ImageOps.fit(Image.open(io.BytesIO(data)).convert("RGB"), size, Image.LANCZOS)
+    out = io.BytesIO()
+    image.save(out, format="WEBP", quality=quality, method=6)
+    return out.getvalue()
+
+
+def cache_poster(session, url, thumb_dir=THUMB_DIR):
+    response = session.get(url, timeout=20)
+    response.raise_for_status()
+    # Content-addressed: identical source images share one thumbnail
+    digest = hashlib.sha256(response.content).hexdigest()
+    name = f"{digest[:2]}/{digest}.webp"
+    path = os.path.join(thumb_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique scratch file: two URLs may point at the same image and race here
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+            f.write(make_thumbnail(response.content))
+        os.replace(f.name, path)
+    return os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+
+
+def cache_posters(urls, manifest, workers=8):
+    pending = [u for u in dict.fromkeys(urls)
+               if u and not (u in manifest and os.path.exists(os.path.join(STATIC_DIR, manifest[u])))]
+    print(f"🗂️ {len(manifest)} cached, {len(pending)} to download")
+
+    from fetch_posters import make_session
+
+    session = make_session(workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(cache_poster, session, url): url for url in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            url = futures[future]
+            try:
+                manifest[url] = future.result()
+            except Exception as e:
+                print(f"❌ Error caching poster '{url}':", e)
+            # Checkpoint the manifest now and then so interrupted runs resume
+            if done % 50 == 0:
+                save_manifest(manifest)
+    session.close()
+    save_manifest(manifest)
+    return manifest
+
+
+if __name__ == "__main__":
+    from recommender.catalog import read_catalog
+
+    parser = argparse.ArgumentParser(description="Download posters once and generate local WebP thumbnails.")
+    parser.add_argument("--catalog", default=CATALOG_CSV)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    # Only the poster column is read from the catalog
+    df = read_catalog(args.catalog, columns=["Poster_URL"])
+    manifest = cache_posters(df["Poster_URL"].dropna().tolist(), load_manifest(), workers=args.workers)
+    print(f"\n✅ Thumbnails saved to: {THUMB_DIR}")
+    print(f"🎉 Total Posters Cached: {len(manifest)}")
@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+
+# Output order of DeepFace's emotion model
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+# The model's input: 48x48 grayscale, scaled to [0, 1]
+INPUT_SIZE = 48
+
+
+class BatchEmotionModel:
+    """DeepFace's emotion classifier run on many frames in one forward pass.
+
+    ``DeepFace.analyze`` detects, crops and classifies a single image per call.
+    Here faces are found with the same Haar cascade ``FaceTracker`` uses (on a
+    downscaled copy), every crop is stacked into one ``(n, 48, 48, 1)`` array
+    and the Keras model is called once. Frames without a face are classified
+    whole, like ``enforce_detection=False``. Results match ``analyze``'s shape.
+    """
+
+    def __init__(self, detect_scale=0.5, batch_size=64):
+        from deepface import DeepFace
+        built = DeepFace.build_model('Emotion')
+        # Newer DeepFace wraps the Keras model in a client object
+        self.model = getattr(built, 'model', built)
+        self.detect_scale = detect_scale
+        self.batch_size = batch_size
+        self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+
+    def detect(self, gray):
+        # Largest face as (x, y, w, h), or None
+        small = cv2.resize(gray, None, fx=self.detect_scale, fy=self.detect_scale)
+        faces = self.cascade.detectMultiScale(small, scaleFactor=1.1, minNeighbors=5)
+        if len(faces) == 0:
+            return None
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        return tuple(int(round(v / self.detect_scale)) for v in (x, y, w, h))
+
+    def crop(self, frame):
+        # BGR or grayscale frame -> (48x48 float32 crop, region dict, face found); without a
+        # face the whole frame is classified
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        box = self.detect(gray)
+        x, y, w, h = box or (0, 0, gray.shape[1], gray.shape[0])
+        face = cv2.resize(gray[y:y + h, x:x + w], (INPUT_SIZE, INPUT_SIZE), interpolation=cv2.INTER_AREA)
+        return face.astype(np.float32) / 255.0, {'x': x, 'y': y, 'w': w, 'h': h}, box is not None
+
+    def predict(self, faces):
+        # (n, 48, 48) crops -> (n, 7) probabilities in EMOTION_LABELS order
+        if len(faces) == 0:
+            return np.zeros((0, len(EMOTION_LABELS)), dtype=np.float32)
+        batch = np.asarray(faces, dtype=np.float32)[..., np.newaxis]
+        return np.concatenate([np.asarray(self.model.predict(batch[i:i + self.batch_size], verbose=0))
+                               for i in range(0, len(batch), self.batch_size)])
+
+    def analyze(self, frames):
+        # One DeepFace-style result list ([{'emotion', 'dominant_emotion', 'region'}]) per frame
+        crops = [self.crop(frame) for frame in frames]
+        probabilities = self.predict([face for face, _, _ in crops])
+        results = []
+        for (_, region, _), scores in zip(crops, probabilities):
+            emotion = {label: float(score) * 100 for label, score in zip(EMOTION_LABELS, scores)}
+            results.append([{'emotion': emotion, 'dominant_emotion': EMOTION_LABELS[int(np.argmax(scores))],
+                             'region': region}])
+        return results
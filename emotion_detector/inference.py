@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Number of recent inferences kept for latency percentiles
+LATENCY_WINDOW = 256
+# Seconds analyze() waits for a free queue slot before giving up with queue.Full
+SUBMIT_TIMEOUT = 5.0
+
+
+class EmotionService:
+    """Process-wide DeepFace emotion inference with a warm model and a worker pool.
+
+    DeepFace (and TensorFlow) is imported, and the emotion model built and
+    exercised once on a blank frame, in a background thread before the workers
+    start, so neither construction nor a request pays for it. Requests go through
+    a bounded queue; ``submit`` raises ``queue.Full`` when it is saturated, and
+    ``analyze`` after waiting ``SUBMIT_TIMEOUT`` seconds for a slot.
+    """
+
+    def __init__(self, workers=2, max_queue=32, detector_backend='opencv'):
+        self.workers = workers
+        self.detector_backend = detector_backend
+        self.ready = threading.Event()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._completed = 0
+        self._failed = 0
+        self._warm_error = None
+        self._deepface = None
+
+        threading.Thread(target=self._start, name="emotion-warmup", daemon=True).start()
+
+    def _start(self):
+        try:
+            from deepface import DeepFace
+            self._deepface = DeepFace
+            DeepFace.build_model('Emotion')
+            self._analyze(np.zeros((224, 224, 3), dtype=np.uint8))
+        except Exception as e:
+            # Workers still start; the error resurfaces on the first real request
+            self._warm_error = e
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"emotion-worker-{i}", daemon=True).start()
+        self.ready.set()
+
+    def _analyze(self, frame):
+        if self._deepface is None:
+            raise RuntimeError("DeepFace failed to load") from self._warm_error
+        return self._deepface.analyze(frame, actions=['emotion'], enforce_detection=False,
+                                      detector_backend=self.detector_backend)
+
+    def _worker(self):
+        while True:
+            frame, future = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            start = time.perf_counter()
+            try:
+                result = self._analyze(frame)
+            except Exception as e:
+                with self._lock:
+                    self._failed += 1
+                future.set_exception(e)
+            else:
+                with self._lock:
+                    self._completed += 1
+                    self._latencies.append(time.perf_counter() - start)
+                future.set_result(result)
+
+    def submit(self, frame, block=False, timeout=None):
+        future = Future()
+        self._queue.put((frame, future), block=block, timeout=timeout)
+        return future
+
+    def analyze(self, frame, timeout=None, submit_timeout=SUBMIT_TIMEOUT):
+        # Same return value as DeepFace.analyze(frame, actions=['emotion'], ...)
+        return self.submit(frame, block=True, timeout=submit_timeout).result(timeout=timeout)
+
+    def metrics(self):
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            completed, failed = self._completed, self._failed
+        stats = {
+            'ready': self.ready.is_set(),
+            'workers': self.workers,
+            'queue_depth': self._queue.qsize(),
+            'completed': completed,
+            'failed': failed,
+        }
+        if self._warm_error is not None:
+            stats['warmup_error'] = str(self._warm_error)
+        if latencies.size:
+            stats['latency_ms_last'] = float(latencies[-1])
+            stats['latency_ms_p50'] = float(np.percentile(latencies, 50))
+            stats['latency_ms_p95'] = float(np.percentile(latencies, 95))
+        return stats
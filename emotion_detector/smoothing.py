@@ -0,0 +1,58 @@
+class EmotionSmoother:
+    """EMA over per-frame emotion probabilities with hysteresis on the label.
+
+    ``update`` takes DeepFace's score dict (percentages or probabilities) and
+    returns ``(emotion, changed)``. The smoothed label only switches when
+    another emotion reaches ``enter`` probability *and* leads the current
+    one by ``margin``, so a face hovering around 49/51% keeps its label.
+    """
+
+    def __init__(self, alpha=0.3, enter=0.35, margin=0.1):
+        self.alpha = alpha
+        self.enter = enter
+        self.margin = margin
+        self.probabilities = {}
+        self.emotion = None
+
+    def update(self, scores):
+        total = sum(scores.values()) or 1.0
+        for emotion, score in scores.items():
+            previous = self.probabilities.get(emotion, score / total)
+            self.probabilities[emotion] = previous + self.alpha * (score / total - previous)
+
+        leader = max(self.probabilities, key=self.probabilities.get)
+        if self.emotion is None:
+            self.emotion = leader
+            return self.emotion, True
+
+        lead = self.probabilities[leader] - self.probabilities.get(self.emotion, 0.0)
+        if leader != self.emotion and self.probabilities[leader] >= self.enter and lead >= self.margin:
+            self.emotion = leader
+            return self.emotion, True
+        return self.emotion, False
+
+    @property
+    def confidence(self):
+        return self.probabilities.get(self.emotion, 0.0)
+
+
+class RecommendationTrigger:
+    """Recompute recommendations only when the smoothed emotion changes.
+
+    ``recommend`` is any ``f(emotion, top_n)`` such as
+    ``recommender.recommend.recommend_movies``.
+    """
+
+    def __init__(self, recommend, smoother=None, top_n=5):
+        self.recommend = recommend
+        self.smoother = smoother or EmotionSmoother()
+        self.top_n = top_n
+        self.recommendations = None
+        self.refreshes = 0
+
+    def update(self, scores):
+        emotion, changed = self.smoother.update(scores)
+        if changed:
+            self.recommendations = self.recommend(emotion, self.top_n)
+            self.refreshes += 1
+        return emotion, self.recommendations, changed
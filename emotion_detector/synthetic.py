@@ -0,0 +1,16 @@
+import numpy as np
+
+
+def make_frames(n, size=(480, 640), seed=0):
+    # Fixed, seeded frames: a soft gradient with noise and a bright oval where a face would be
+    rng = np.random.default_rng(seed)
+    height, width = size
+    y, x = np.mgrid[0:height, 0:width]
+    face = ((x - width / 2) / (width / 6)) ** 2 + ((y - height / 2) / (height / 4)) ** 2 <= 1
+    frames = []
+    for _ in range(n):
+        frame = (np.stack([x * 255 / width, y * 255 / height, np.full_like(x, 128)], axis=-1)
+                 + rng.normal(0, 12, size=(height, width, 3)))
+        frame[face] = 200 + rng.normal(0, 8, size=(int(face.sum()), 3))
+        frames.append(np.clip(frame, 0, 255).astype(np.uint8))
+    return frames
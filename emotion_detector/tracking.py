@@ -0,0 +1,82 @@
+from deepface import DeepFace
+import cv2
+
+
+class FaceTracker:
+    """Detect a face once, then follow it cheaply between inferences.
+
+    Full Haar-cascade detection (on a downscaled frame) runs only when there
+    is no face yet, every ``redetect_every`` frames, or when template
+    matching inside a window around the previous box scores below
+    ``min_confidence``. Only the cropped face, resized to ``roi_size``
+    pixels, is sent to the emotion classifier with detection skipped.
+    """
+
+    def __init__(self, min_confidence=0.6, redetect_every=30, roi_size=96, margin=0.5, detect_scale=0.5):
+        self.min_confidence = min_confidence
+        self.redetect_every = redetect_every
+        self.roi_size = roi_size
+        self.margin = margin
+        self.detect_scale = detect_scale
+        self.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        self.box = None
+        self.template = None
+        self.since_detect = 0
+        self.detections = 0
+        self.tracked = 0
+
+    def _detect(self, gray):
+        small = cv2.resize(gray, None, fx=self.detect_scale, fy=self.detect_scale)
+        faces = self.cascade.detectMultiScale(small, scaleFactor=1.1, minNeighbors=5)
+        if len(faces) == 0:
+            return None
+        # Follow the largest face
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        return tuple(int(round(v / self.detect_scale)) for v in (x, y, w, h))
+
+    def _track(self, gray):
+        x, y, w, h = self.box
+        dx, dy = int(w * self.margin), int(h * self.margin)
+        x0, y0 = max(x - dx, 0), max(y - dy, 0)
+        x1, y1 = min(x + w + dx, gray.shape[1]), min(y + h + dy, gray.shape[0])
+        window = gray[y0:y1, x0:x1]
+        if window.shape[0] < h or window.shape[1] < w:
+            return None, 0.0
+        scores = cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (mx, my) = cv2.minMaxLoc(scores)
+        return (x0 + mx, y0 + my, w, h), score
+
+    def update(self, frame):
+        # Returns the face box (x, y, w, h) in frame coordinates, or None
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        box = None
+        if self.box is not None and self.since_detect < self.redetect_every:
+            box, score = self._track(gray)
+            if score < self.min_confidence:
+                box = None
+
+        if box is None:
+            box = self._detect(gray)
+            self.since_detect = 0
+            self.detections += 1
+        else:
+            self.since_detect += 1
+            self.tracked += 1
+
+        self.box = box
+        if box is not None:
+            x, y, w, h = box
+            self.template = gray[y:y + h, x:x + w].copy()
+        return box
+
+    def analyze(self, frame):
+        # Drop-in replacement for DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
+        box = self.update(frame)
+        if box is None:
+            return DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
+
+        x, y, w, h = box
+        roi = cv2.resize(frame[y:y + h, x:x + w], (self.roi_size, self.roi_size), interpolation=cv2.INTER_AREA)
+        result = DeepFace.analyze(roi, actions=['emotion'], detector_backend='skip', enforce_detection=False)
+        result[0]['region'] = {'x': x, 'y': y, 'w': w, 'h': h}
+        return result
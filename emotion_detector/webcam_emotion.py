@@ -1,30 +1,191 @@
+import argparse
+import threading
+import time
+
+import os
+import sys
+
 from deepface import DeepFace
 import cv2
 
-cap = cv2.VideoCapture(0)
-print("Press 'q' to quit...")
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from emotion_detector.tracking import FaceTracker
+from emotion_detector.smoothing import EmotionSmoother, RecommendationTrigger
+
+
+class FrameSlot:
+    """Single-slot mailbox: writers overwrite, readers only ever see the newest item."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+
+    def put(self, item):
+        with self._cond:
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, after_seq=0, timeout=None):
+        # Wait for something newer than after_seq; returns (seq, item)
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after_seq, timeout=timeout)
+            return self._seq, self._item
+
+
+class EmotionPipeline:
+    """Capture thread -> latest-frame inference worker -> full-rate render loop.
+
+    The inference worker always takes the newest captured frame and skips any
+    it missed, so display runs at camera FPS while inference runs at its own
+    pace. ``interval`` sets a minimum gap between inferences; ``max_cpu``
+    (0-1] additionally idles the worker in proportion to the last inference
+    time so it uses at most that share of one core.
+    """
+
+    def __init__(self, capture, interval=0.0, max_cpu=1.0, analyze=None, on_result=None):
+        if not 0 < max_cpu <= 1:
+            raise ValueError("max_cpu must be in (0, 1]")
+        self.capture = capture
+        self.interval = interval
+        self.max_cpu = max_cpu
+        self.analyze = analyze or (lambda frame: DeepFace.analyze(frame, actions=['emotion'],
+                                                                  enforce_detection=False))
+        self.on_result = on_result
+        self.frames = FrameSlot()
+        self.results = FrameSlot()
+        self.running = threading.Event()
+        self.captured = 0
+        self.inferred = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        self.running.set()
+        threading.Thread(target=self._capture_loop, name="capture", daemon=True).start()
+        threading.Thread(target=self._inference_loop, name="inference", daemon=True).start()
+
+    def stop(self):
+        self.running.clear()
+
+    def _capture_loop(self):
+        while self.running.is_set():
+            ret, frame = self.capture.read()
+            if not ret:
+                self.running.clear()
+                break
+            self.captured += 1
+            self.frames.put(frame)
+
+    def _inference_loop(self):
+        seq = 0
+        while self.running.is_set():
+            new_seq, frame = self.frames.get(after_seq=seq, timeout=0.5)
+            if new_seq == seq:
+                continue
+            # Frames captured while the previous inference was running are skipped
+            self.dropped += new_seq - seq - 1
+            seq = new_seq
+
+            start = time.perf_counter()
+            try:
+                result = self.analyze(frame)
+                if self.on_result:
+                    self.on_result(result[0])
+                self.results.put(result[0])
+                self.inferred += 1
+            except Exception as e:
+                self.errors += 1
+                print("Error:", e)
+            elapsed = time.perf_counter() - start
+
+            pause = max(self.interval - elapsed, elapsed * (1.0 / self.max_cpu - 1.0), 0.0)
+            if pause:
+                time.sleep(pause)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Live webcam emotion detection.")
+    parser.add_argument("--camera", type=int, default=0, help="Camera index for cv2.VideoCapture")
+    parser.add_argument("--interval", type=float, default=0.0,
+                        help="Minimum seconds between emotion inferences")
+    parser.add_argument("--max-cpu", type=float, default=1.0,
+                        help="Fraction (0-1] of one core the inference worker may use")
+    parser.add_argument("--track", action="store_true",
+                        help="Follow the face between inferences and classify only the cropped face")
+    parser.add_argument("--smoothing", type=float, default=0.3,
+                        help="EMA weight of each new inference (1 disables smoothing)")
+    parser.add_argument("--recommend", action="store_true",
+                        help="Print movie recommendations whenever the smoothed emotion changes")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print capture/render/inference FPS and dropped frames once a second")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    cap = cv2.VideoCapture(args.camera)
+    tracker = FaceTracker() if args.track else None
+    smoother = EmotionSmoother(alpha=args.smoothing)
+
+    if args.recommend:
+        from recommender.recommend import recommend_movies
+        trigger = RecommendationTrigger(recommend_movies, smoother)
+
+        def on_result(result):
+            emotion, recommendations, changed = trigger.update(result['emotion'])
+            if changed:
+                titles = ", ".join(recommendations['Movie_Title']) if not recommendations.empty else "none"
+                print(f"🎬 Mood is now {emotion}: {titles}")
+    else:
+        def on_result(result):
+            smoother.update(result['emotion'])
+
+    pipeline = EmotionPipeline(cap, interval=args.interval, max_cpu=args.max_cpu,
+                               analyze=tracker.analyze if tracker else None, on_result=on_result)
+    pipeline.start()
+    print("Press 'q' to quit...")
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
+    seq = 0
+    rendered = 0
+    last_stats = (time.perf_counter(), 0, 0, 0)
+    while pipeline.running.is_set():
+        new_seq, frame = pipeline.frames.get(after_seq=seq, timeout=0.5)
+        if new_seq == seq:
+            continue
+        seq = new_seq
+        frame = frame.copy()
 
-    try:
-        result = DeepFace.analyze(frame, actions=['emotion'], enforce_detection=False)
-        print("Full Result:", result)
-        dominant_emotion = result[0]['dominant_emotion']
+        # Overlay the most recent (smoothed) emotion on every frame
+        _, latest = pipeline.results.get(timeout=0)
+        if latest is not None and smoother.emotion is not None:
+            cv2.putText(frame, f"Emotion: {smoother.emotion} ({smoother.confidence * 100:.0f}%)", (50, 50),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            if tracker and 'region' in latest:
+                region = latest['region']
+                cv2.rectangle(frame, (region['x'], region['y']),
+                              (region['x'] + region['w'], region['y'] + region['h']), (0, 255, 0), 2)
 
-        # Display the emotion on the frame
-        cv2.putText(frame, f"Emotion: {dominant_emotion}", (50, 50),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-    except Exception as e:
-        print("Error:", e)
+        # Show frame
+        cv2.imshow("Webcam Emotion Detector", frame)
+        rendered += 1
 
-    # Show frame
-    cv2.imshow("Webcam Emotion Detector", frame)
+        if args.stats:
+            now = time.perf_counter()
+            then, captured, inferred, shown = last_stats
+            if now - then >= 1.0:
+                span = now - then
+                print(f"capture {(pipeline.captured - captured) / span:.1f} fps | "
+                      f"render {(rendered - shown) / span:.1f} fps | "
+                      f"inference {(pipeline.inferred - inferred) / span:.1f} fps | "
+                      f"dropped {pipeline.dropped}" +
+                      (f" | detections {tracker.detections}, tracked {tracker.tracked}" if tracker else ""))
+                last_stats = (now, pipeline.captured, pipeline.inferred, rendered)
 
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
 
-cap.release()
-cv2.destroyAllWindows()
+    pipeline.stop()
+    cap.release()
+    cv2.destroyAllWindows()
@@ -1,64 +1,170 @@
-import pandas as pd
 import requests
 import os
-from time import sleep
+import sqlite3
+import threading
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 
-# TMDB API config
-API_KEY = "30897ca5a402d735c70a3b1270ccfacc"
-TMDB_SEARCH_URL = "https://api.themoviedb.org/3/search/movie"
+from recommender.catalog import read_catalog, convert_catalog
+
+# TMDB API config (override with TMDB_API_KEY / TMDB_SEARCH_URL, e.g. to point at a local stand-in server)
+API_KEY = os.environ.get("TMDB_API_KEY", "30897ca5a402d735c70a3b1270ccfacc")
+TMDB_SEARCH_URL = os.environ.get("TMDB_SEARCH_URL", "https://api.themoviedb.org/3/search/movie")
 POSTER_BASE_URL = "https://image.tmdb.org/t/p/w500"
 
 # Paths
 BASE_DIR = os.path.dirname(__file__)
 INPUT_CSV = os.path.join(BASE_DIR, "data", "movies.csv")
 OUTPUT_CSV = os.path.join(BASE_DIR, "data", "movies_with_posters.csv")
+CACHE_DB = os.path.join(BASE_DIR, "data", "poster_cache.sqlite")
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` requests per second, bursts up to ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class PosterCache:
+    """Title -> poster URL results persisted in SQLite, committed as they arrive."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS posters ("
+            "title TEXT PRIMARY KEY, poster_url TEXT NOT NULL, fetched_at REAL NOT NULL)")
+        self.conn.commit()
+
+    def fresh(self, max_age):
+        # Titles whose cached entry is recent enough to skip
+        cutoff = time.time() - max_age if max_age is not None else float("-inf")
+        rows = self.conn.execute("SELECT title, poster_url FROM posters WHERE fetched_at >= ?", (cutoff,))
+        return dict(rows.fetchall())
+
+    def put(self, title, poster_url):
+        self.conn.execute("INSERT OR REPLACE INTO posters VALUES (?, ?, ?)", (title, poster_url, time.time()))
+        self.conn.commit()
+
+    def all(self):
+        return dict(self.conn.execute("SELECT title, poster_url FROM posters").fetchall())
+
+    def close(self):
+        self.conn.close()
 
-# Load movie dataset
-try:
-    df = pd.read_csv(INPUT_CSV)
-except FileNotFoundError:
-    print("❌ movies.csv not found in data/ folder.")
-    exit(1)
 
-# Prepare output list
-poster_data = []
+def make_session(workers):
+    # One pooled keep-alive connection per worker
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
-# Process each movie
-for index, row in df.iterrows():
-    title = row.get("Movie_Title") or row.get("title") or ""
-    genre = row.get("Genre", "")
 
-    if not title:
-        continue
+def fetch_poster(session, bucket, title, search_url=TMDB_SEARCH_URL, api_key=API_KEY, timeout=10):
+    bucket.acquire()
+    response = session.get(search_url, params={"api_key": api_key, "query": title}, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if data["results"]:
+        poster_path = data["results"][0].get("poster_path")
+        return POSTER_BASE_URL + poster_path if poster_path else ""
+    return ""
 
-    params = {"api_key": API_KEY, "query": title}
+
+def fetch_posters(titles, cache, workers=8, rate=20.0, max_age=None,
+                  search_url=TMDB_SEARCH_URL, api_key=API_KEY):
+    # Fetch every title not already cached (or cached longer than max_age seconds ago)
+    fresh = cache.fresh(max_age)
+    pending = [t for t in dict.fromkeys(titles) if t and t not in fresh]
+    print(f"🗂️ {len(fresh)} cached, {len(pending)} to fetch")
+
+    bucket = TokenBucket(rate)
+    session = make_session(workers)
+    found = failed = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_poster, session, bucket, title, search_url, api_key): title
+                   for title in pending}
+        for future in as_completed(futures):
+            title = futures[future]
+            try:
+                full_url = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"❌ Error fetching poster for '{title}':", e)
+                continue
+            # Checkpoint immediately so a crash loses at most the in-flight requests
+            cache.put(title, full_url)
+            if full_url:
+                found += 1
+                print(f"✅ Found: {title}")
+            else:
+                print(f"❌ Not found: {title}")
+    session.close()
+
+    elapsed = time.perf_counter() - start
+    if pending:
+        print(f"⏱️ {len(pending)} requests in {elapsed:.1f}s ({len(pending) / max(elapsed, 1e-9):.1f}/s), "
+              f"{found} found, {failed} failed")
+    return cache.all()
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Fetch TMDB poster URLs for the movie catalog.")
+    parser.add_argument("--input", default=INPUT_CSV)
+    parser.add_argument("--output", default=OUTPUT_CSV)
+    parser.add_argument("--cache", default=CACHE_DB, help="SQLite response cache (resumes interrupted runs)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent requests")
+    parser.add_argument("--rate", type=float, default=20.0, help="Max requests per second")
+    parser.add_argument("--max-age-days", type=float, default=None,
+                        help="Re-fetch cached entries older than this (default: never)")
+    parser.add_argument("--search-url", default=TMDB_SEARCH_URL)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+
+    # Load movie dataset
     try:
-        response = requests.get(TMDB_SEARCH_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        if data["results"]:
-            poster_path = data["results"][0].get("poster_path")
-            full_url = POSTER_BASE_URL + poster_path if poster_path else ""
-            print(f"✅ Found: {title}")
-        else:
-            full_url = ""
-            print(f"❌ Not found: {title}")
-
-        poster_data.append({
-            "Movie_Title": title,
-            "Genre": genre,
-            "Poster_URL": full_url
-        })
-
-        sleep(0.2)  # To avoid hitting API rate limits
-
-    except Exception as e:
-        print(f"❌ Error fetching poster for '{title}':", e)
-        continue
-
-# Save to CSV
-poster_df = pd.DataFrame(poster_data)
-poster_df.to_csv(OUTPUT_CSV, index=False)
-print(f"\n✅ Poster URLs saved to: {OUTPUT_CSV}")
-print(f"🎉 Total Movies Processed: {len(poster_df)}")
+        df = read_catalog(args.input)
+    except FileNotFoundError:
+        print("❌ movies.csv not found in data/ folder.")
+        exit(1)
+
+    title_column = "Movie_Title" if "Movie_Title" in df.columns else "title"
+    titles = df[title_column].fillna("").astype(str).tolist()
+
+    cache = PosterCache(args.cache)
+    max_age = args.max_age_days * 86400 if args.max_age_days is not None else None
+    posters = fetch_posters(titles, cache, workers=args.workers, rate=args.rate,
+                            max_age=max_age, search_url=args.search_url)
+    cache.close()
+
+    # Save to CSV, keeping every input column and only rows with a fetched result
+    poster_df = df[df[title_column].isin(posters.keys())].copy()
+    poster_df["Poster_URL"] = poster_df[title_column].map(posters)
+    poster_df.to_csv(args.output, index=False)
+    convert_catalog(args.output)
+    print(f"\n✅ Poster URLs saved to: {args.output}")
+    print(f"🎉 Total Movies Processed: {len(poster_df)}")
@@ -1,14 +1,23 @@
-import pandas as pd
+import argparse
 
-# Load the original movie CSV from the data folder
-df = pd.read_csv("data/movies_with_posters.csv")
+from recommender.catalog import CATALOG_CSV, enrich_catalog
 
-# Add a YouTube trailer search URL
-df["YouTube_URL"] = df["Movie_Title"].apply(
-    lambda title: f"https://www.youtube.com/results?search_query={title.strip().replace(' ', '+')}+trailer"
-)
+TRAILER_SEARCH_URL = "https://www.youtube.com/results?search_query="
 
-# Save it back into the same folder or overwrite
-df.to_csv("data/movies_with_posters.csv", index=False)
 
-print("✅ Trailer links added to data/movies.csv!")
+def trailer_urls(movies):
+    # YouTube trailer search URL per title, built with vectorized string ops
+    titles = movies["Movie_Title"].astype(str).str.strip().str.replace(" ", "+", regex=False)
+    return TRAILER_SEARCH_URL + titles + "+trailer"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add YouTube trailer links to the catalog, streaming it in chunks.")
+    parser.add_argument("--catalog", default=CATALOG_CSV)
+    parser.add_argument("--chunksize", type=int, default=10000)
+    parser.add_argument("--overwrite", action="store_true", help="Rebuild links that are already set")
+    args = parser.parse_args()
+
+    filled = enrich_catalog(args.catalog, "YouTube_URL", trailer_urls,
+                            chunksize=args.chunksize, overwrite=args.overwrite)
+    print(f"✅ Trailer links added to {filled} movies in {args.catalog}")
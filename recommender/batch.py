@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from recommender.similarity import normalize_rows
+
+
+class BatchRecommendations:
+    """Columnar result of ``recommend_movies_batch``.
+
+    Recommendations for every query are stored back to back in flat
+    ``rows`` / ``scores`` arrays; query ``i`` owns the slice
+    ``offsets[i]:offsets[i + 1]``. Use ``frame(i)`` to materialise one
+    query as the same DataFrame ``recommend_movies`` returns.
+    """
+
+    def __init__(self, index, offsets, rows, scores):
+        self.index = index
+        self.offsets = offsets
+        self.rows = rows
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def rows_for(self, i):
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def scores_for(self, i):
+        return self.scores[self.offsets[i]:self.offsets[i + 1]]
+
+    def frame(self, i):
+        return self.index.results.iloc[self.rows_for(i)]
+
+    def to_columns(self):
+        counts = np.diff(self.offsets)
+        return {
+            'query': np.repeat(np.arange(len(self)), counts),
+            'rank': np.arange(len(self.rows)) - np.repeat(self.offsets[:-1], counts),
+            'row': self.rows,
+            'score': self.scores,
+            'Movie_Title': self.index.df['Movie_Title'].to_numpy()[self.rows],
+        }
+
+    def to_frame(self):
+        return pd.DataFrame(self.to_columns())
+
+
+def emotion_weights(emotions, emotion_order):
+    """Turn emotion names, score dicts or probability vectors into a weight matrix.
+
+    Rows are normalised to sum to one; names or keys outside ``emotion_order``
+    (e.g. DeepFace's ``disgust``) carry no weight, so such queries come back empty.
+    """
+    if isinstance(emotions, np.ndarray) and emotions.ndim == 2:
+        weights = emotions.astype(np.float64, copy=True)
+    else:
+        position = {emotion: i for i, emotion in enumerate(emotion_order)}
+        weights = np.zeros((len(emotions), len(emotion_order)))
+        for i, item in enumerate(emotions):
+            if isinstance(item, str):
+                j = position.get(item.lower())
+                if j is not None:
+                    weights[i, j] = 1.0
+            elif isinstance(item, dict):
+                for emotion, score in item.items():
+                    j = position.get(emotion.lower())
+                    if j is not None:
+                        weights[i, j] = score
+            else:
+                weights[i] = np.asarray(item, dtype=np.float64)
+
+    weights[weights < 0] = 0
+    totals = weights.sum(axis=1, keepdims=True)
+    np.divide(weights, totals, out=weights, where=totals > 0)
+    return weights
+
+
+def _per_item(value, n, default):
+    if value is None:
+        return [default] * n
+    if np.isscalar(value):
+        return [value] * n
+    if len(value) != n:
+        raise ValueError(f"Expected {n} per-item values, got {len(value)}")
+    return list(value)
+
+
+def _exclude_lists(exclude, n_queries, n_rows):
+    # One list of titles or row ids per query. A bare title or a flat list is rejected
+    # rather than read one character (or id) at a time, and ids must be catalog rows.
+    if exclude is None:
+        return [None] * n_queries
+    if isinstance(exclude, str) or len(exclude) != n_queries:
+        raise ValueError(f"exclude must hold one list of titles or row ids per query ({n_queries})")
+    for movies in exclude:
+        if movies is None:
+            continue
+        if isinstance(movies, (str, bytes)) or np.isscalar(movies):
+            raise ValueError(f"exclude must hold one list of titles or row ids per query, got {movies!r}")
+        for movie in movies:
+            if isinstance(movie, str):
+                continue
+            if isinstance(movie, (bool, np.bool_)) or not isinstance(movie, (int, np.integer)) \
+                    or not 0 <= movie < n_rows:
+                raise ValueError(f"Excluded row id {movie!r} is not a catalog row (0 to {n_rows - 1})")
+    return list(exclude)
+
+
+def _exclusion_pairs(index, exclude):
+    # Flatten validated per-item exclusion lists into (item, row) pairs
+    items, rows = [], []
+    for i, movies in enumerate(exclude):
+        for movie in movies or ():
+            row = index.title_rows.get(movie) if isinstance(movie, str) else int(movie)
+            if row is not None:
+                items.append(i)
+                rows.append(row)
+    return np.asarray(items, dtype=np.int64), np.asarray(rows, dtype=np.int64)
+
+
+def recommend_batch(index, emotions, top_n=5, exclude=None, backend='exact'):
+    weights = emotion_weights(emotions, index.emotions)
+    n_queries = weights.shape[0]
+    top_n = np.asarray(_per_item(top_n, n_queries, 5), dtype=np.int64)
+    exclude = _exclude_lists(exclude, n_queries, len(index.df))
+
+    centroids, members = index.emotion_centroids()
+    # Blend the per-emotion centroids; normalised, so the search scores are cosines
+    queries = normalize_rows(sp.csr_matrix(weights) @ centroids)
+    # A movie is a candidate if it belongs to any emotion with non-zero weight
+    allowed = sp.csr_matrix(weights > 0, dtype=np.float64) @ members
+    banned = _exclusion_pairs(index, exclude)
+
+    k = int(max(top_n.max(initial=0), 0))
+    rows, scores = index.similarity_backend(backend).search(queries, k, allowed, banned)
+
+    keep = (np.arange(k) < top_n[:, None]) & (rows >= 0)
+    offsets = np.zeros(n_queries + 1, dtype=np.int64)
+    np.cumsum(keep.sum(axis=1), out=offsets[1:])
+    return BatchRecommendations(index, offsets, rows[keep], scores[keep].astype(np.float32))
@@ -0,0 +1,25 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recommender import recommend
+
+# Offline build: python -m recommender.build_index
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mapped recommendation index.")
+    parser.add_argument("--catalog", default=recommend.CATALOG_PATH, help="Movie catalog CSV")
+    parser.add_argument("--out", default=recommend.INDEX_DIR, help="Output artifact directory")
+    args = parser.parse_args()
+
+    recommend.CATALOG_PATH = args.catalog
+    recommend.INDEX_DIR = args.out
+
+    start = time.perf_counter()
+    index = recommend.build_index(save=True)
+    elapsed = time.perf_counter() - start
+
+    rows, terms = index.tfidf_matrix.shape
+    print(f"✅ Index saved to: {os.path.abspath(args.out)}")
+    print(f"🎉 {rows} movies, {terms} terms, {len(index.rankings)} emotions in {elapsed:.2f}s")
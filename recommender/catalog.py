@@ -0,0 +1,216 @@
+import os
+import time
+import tempfile
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# CSVs stay the editable source; each gets a typed Parquet twin next to it
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+CATALOG_CSV = os.path.join(DATA_DIR, "movies_with_posters.csv")
+MOVIES_CSV = os.path.join(DATA_DIR, "movies.csv")
+
+# Bump when the typed layout below changes so old artifacts are ignored
+CATALOG_FORMAT = 1
+ID_COLUMN = "movie_id"
+SOURCE_KEY = b"catalog_source"
+ROW_GROUP_SIZE = 65536
+
+
+def artifact_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return f"{CATALOG_FORMAT}:{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8")
+
+
+def is_fresh(csv_path, parquet_path):
+    # The artifact records which CSV (mtime, size) it was converted from
+    if not os.path.exists(parquet_path):
+        return False
+    metadata = pq.read_schema(parquet_path).metadata or {}
+    return metadata.get(SOURCE_KEY) == source_signature(csv_path)
+
+
+def _typed(df, start=0, coerce=True):
+    # Movie ids are row numbers in the source CSV
+    df.index = np.arange(start, start + len(df), dtype=np.int32)
+    if not coerce:
+        return df
+    if "Genre" in df.columns:
+        df["Genre"] = df["Genre"].astype("category")
+    if "Rating" in df.columns:
+        df["Rating"] = pd.to_numeric(df["Rating"], errors="coerce").astype("float32")
+    return df
+
+
+def _from_arrow(table):
+    df = table.to_pandas()
+    df.index = df.pop(ID_COLUMN).to_numpy()
+    return df
+
+
+def _projection(columns):
+    return None if columns is None else [ID_COLUMN] + [c for c in columns if c != ID_COLUMN]
+
+
+def convert_catalog(csv_path, parquet_path=None, chunksize=ROW_GROUP_SIZE):
+    # Streams the CSV into Parquet one row group at a time, so memory stays bounded by chunksize
+    parquet_path = parquet_path or artifact_path(csv_path)
+    signature = source_signature(csv_path)
+    # Write beside the target and swap in, so readers never see a half-written file
+    tmp_path = parquet_path + ".tmp"
+    writer = None
+    try:
+        for chunk in iter_catalog(csv_path, chunksize=chunksize, parse_csv=True):
+            table = pa.Table.from_pandas(chunk.rename_axis(ID_COLUMN).reset_index(), preserve_index=False)
+            if writer is None:
+                # Genre dictionaries differ per chunk; a wide index type fits all of them
+                schema = table.schema
+                if "Genre" in schema.names:
+                    genre = schema.get_field_index("Genre")
+                    schema = schema.set(genre, pa.field("Genre", pa.dictionary(pa.int32(), pa.string())))
+                schema = schema.with_metadata({**(schema.metadata or {}), SOURCE_KEY: signature})
+                writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+            writer.write_table(table.cast(schema), row_group_size=chunksize)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # Header-only CSV: still record an (empty) up-to-date artifact
+        table = pa.Table.from_pandas(_typed(pd.read_csv(csv_path)).rename_axis(ID_COLUMN).reset_index(),
+                                     preserve_index=False)
+        pq.write_table(table.replace_schema_metadata({**(table.schema.metadata or {}), SOURCE_KEY: signature}),
+                       tmp_path)
+    os.replace(tmp_path, parquet_path)
+    return parquet_path
+
+
+def read_catalog(path=CATALOG_CSV, columns=None, memory_map=True):
+    # Reads the Parquet twin when it is up to date, else parses the CSV with the same types
+    if path.endswith(".parquet"):
+        parquet_path = path
+    else:
+        parquet_path = artifact_path(path)
+        if not is_fresh(path, parquet_path):
+            return _typed(pd.read_csv(path, usecols=columns))
+    return _from_arrow(pq.read_table(parquet_path, columns=_projection(columns), memory_map=memory_map))
+
+
+def iter_catalog(path=CATALOG_CSV, columns=None, chunksize=10000, parse_csv=False, typed=True):
+    # Streams the catalog in chunks of about chunksize rows, ids numbered across chunks.
+    # typed=False keeps the CSV's values as written (e.g. a "PG-13" Rating in a review dump)
+    parquet_path = path if path.endswith(".parquet") else artifact_path(path)
+    if path == parquet_path or (typed and not parse_csv and is_fresh(path, parquet_path)):
+        parquet = pq.ParquetFile(parquet_path, memory_map=True)
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=_projection(columns)):
+            yield _from_arrow(pa.Table.from_batches([batch]))
+        return
+
+    try:
+        reader = pd.read_csv(path, usecols=columns, chunksize=chunksize)
+    except pd.errors.EmptyDataError:
+        # A zero-byte file: no header, no rows
+        return
+    start = 0
+    for chunk in reader:
+        yield _typed(chunk, start, coerce=typed)
+        start += len(chunk)
+
+
+def upsert_catalog(csv_path, movies, key="Movie_Title"):
+    # Rows whose key is already in the CSV are edited in place, the rest appended in order.
+    # Pure appends stream onto the end of the file; edits have to rewrite it.
+    header = pd.read_csv(csv_path, nrows=0).columns
+    movies = movies.drop_duplicates(key, keep="last")
+    known = {title: row for row, title in enumerate(read_catalog(csv_path, columns=[key])[key])}
+    edited = movies[key].isin(known.keys()).to_numpy()
+
+    if not edited.any():
+        movies.reindex(columns=header).to_csv(csv_path, mode="a", header=False, index=False)
+    else:
+        df = read_catalog(csv_path)
+        df["Genre"] = df["Genre"].astype(object)
+        columns = [c for c in header if c in movies.columns]
+        rows = movies.loc[edited, key].map(known).to_numpy()
+        df.iloc[rows, [df.columns.get_loc(c) for c in columns]] = movies.loc[edited, columns].astype(object).to_numpy()
+        df = pd.concat([df, movies.loc[~edited].reindex(columns=header)])
+        tmp_path = csv_path + ".tmp"
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, csv_path)
+    convert_catalog(csv_path)
+    return int(edited.sum()), int((~edited).sum())
+
+
+def enrich_catalog(csv_path, column, build, chunksize=10000, overwrite=False):
+    # Fill a derived column chunk by chunk: build(rows) gets only the rows still missing a
+    # value and returns one value per row. The result goes to a scratch file that is
+    # swapped in atomically, and the file is left untouched when nothing was missing.
+    directory = os.path.dirname(os.path.abspath(csv_path))
+    filled = 0
+    first = True
+    with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False,
+                                     encoding="utf-8", newline="") as out:
+        try:
+            for chunk in iter_catalog(csv_path, chunksize=chunksize):
+                if column not in chunk.columns:
+                    chunk[column] = pd.Series(pd.NA, index=chunk.index, dtype=object)
+                current = chunk[column]
+                missing = (current.isna() | (current.astype(str).str.strip() == "")).to_numpy()
+                if overwrite:
+                    missing[:] = True
+                if missing.any():
+                    chunk[column] = current.astype(object)
+                    chunk.loc[missing, column] = pd.Series(build(chunk.loc[missing]), index=chunk.index[missing])
+                    filled += int(missing.sum())
+                chunk.to_csv(out, header=first, index=False)
+                first = False
+        except BaseException:
+            out.close()
+            os.remove(out.name)
+            raise
+
+    if filled:
+        os.replace(out.name, csv_path)
+        convert_catalog(csv_path)
+    else:
+        os.remove(out.name)
+    return filled
+
+
+def lower_categories(column):
+    # Lowercase a categorical column per category rather than per row
+    categories = column.cat.categories.str.lower()
+    unique = categories.unique()
+    codes = column.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, unique.get_indexer(categories)[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, unique), index=column.index, name=column.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert catalog CSVs to typed Parquet files next to them.")
+    parser.add_argument("csv", nargs="*", default=[MOVIES_CSV, CATALOG_CSV])
+    args = parser.parse_args()
+
+    for csv_path in args.csv:
+        if not os.path.exists(csv_path):
+            print(f"⚠️ Skipping missing {csv_path}")
+            continue
+        parquet_path = convert_catalog(csv_path)
+
+        start = time.perf_counter()
+        df = pd.read_csv(csv_path)
+        csv_seconds = time.perf_counter() - start
+        csv_bytes = df.memory_usage(deep=True).sum()
+        start = time.perf_counter()
+        df = read_catalog(parquet_path)
+        parquet_seconds = time.perf_counter() - start
+        parquet_bytes = df.memory_usage(deep=True).sum()
+
+        print(f"✅ {os.path.basename(csv_path)} -> {os.path.basename(parquet_path)}: {len(df)} movies, "
+              f"load {csv_seconds * 1000:.1f} -> {parquet_seconds * 1000:.1f} ms, "
+              f"memory {csv_bytes / 1024:.0f} -> {parquet_bytes / 1024:.0f} KiB")
@@ -0,0 +1,84 @@
+import numpy as np
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def split_genres(value):
+    # "Action, Sci-Fi" -> ['action', 'sci-fi']; missing values have no genres
+    if not isinstance(value, str):
+        return []
+    return [genre for genre in (g.strip().lower() for g in value.split(',')) if genre]
+
+
+class GenreIndex:
+    """Inverted index from genre name to the sorted row ids carrying it.
+
+    Built once from the catalog's comma separated ``Genre`` column, so a
+    multi-genre filter is a union of a few integer arrays instead of a
+    Python ``str.split`` over every row.
+    """
+
+    def __init__(self, genre_column):
+        if hasattr(genre_column, 'cat'):
+            self.postings = self._categorical_postings(genre_column)
+            return
+
+        postings = {}
+        for row, row_genres in enumerate(genre_column):
+            for genre in split_genres(row_genres):
+                postings.setdefault(genre, []).append(row)
+
+        # Rows are visited in order, so every posting list is already sorted
+        self.postings = {genre: np.asarray(rows, dtype=np.int64) for genre, rows in postings.items()}
+
+    @staticmethod
+    def _categorical_postings(genre_column):
+        # Split each distinct genre string once, then gather its rows by category code
+        codes = genre_column.cat.codes.to_numpy()
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(genre_column.cat.categories) + 1))
+        postings = {}
+        for code, row_genres in enumerate(genre_column.cat.categories):
+            rows = order[bounds[code]:bounds[code + 1]]
+            for genre in split_genres(row_genres) if rows.size else []:
+                postings.setdefault(genre, []).append(rows)
+        return {genre: np.sort(np.concatenate(parts)).astype(np.int64) for genre, parts in postings.items()}
+
+    @classmethod
+    def from_postings(cls, postings):
+        index = cls.__new__(cls)
+        index.postings = postings
+        return index
+
+    def update(self, rows, old_genres, new_genres):
+        # Move edited rows between posting lists and add appended ones; only the
+        # genres those rows touch are rewritten
+        removed, added = {}, {}
+        for row, old, new in zip(rows, old_genres, new_genres):
+            old, new = set(split_genres(old)), set(split_genres(new))
+            for genre in old - new:
+                removed.setdefault(genre, []).append(row)
+            for genre in new - old:
+                added.setdefault(genre, []).append(row)
+
+        for genre, genre_rows in removed.items():
+            self.postings[genre] = np.setdiff1d(self.postings[genre], genre_rows, assume_unique=True)
+        for genre, genre_rows in added.items():
+            self.postings[genre] = np.union1d(self.postings.get(genre, _EMPTY), genre_rows).astype(np.int64)
+        self.postings = {genre: rows for genre, rows in self.postings.items() if rows.size}
+
+    def genres(self):
+        return sorted(self.postings)
+
+    def rows(self, genre):
+        return self.postings.get(genre.strip().lower(), _EMPTY)
+
+    def rows_for(self, target_genres):
+        # Sorted, de-duplicated union of the posting lists
+        lists = [self.rows(g) for g in target_genres]
+        lists = [rows for rows in lists if rows.size]
+        if not lists:
+            return _EMPTY
+        if len(lists) == 1:
+            return lists[0]
+        return np.unique(np.concatenate(lists))
@@ -0,0 +1,364 @@
+import os
+import json
+import shutil
+import hashlib
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+import pyarrow.feather as feather
+
+from recommender.catalog import read_catalog, lower_categories
+from recommender.genre_index import GenreIndex
+from recommender.similarity import make_backend, normalize_rows, top_k
+
+# Columns returned for every recommendation
+RESULT_COLUMNS = ['Movie_Title', 'Genre', 'Poster_URL', 'Description', 'YouTube_URL', 'Rating']
+
+# Which fallback produced a ranking table
+FALLBACK_NONE = None
+FALLBACK_NEUTRAL = 'neutral'
+FALLBACK_GLOBAL = 'global'
+
+# On-disk artifact layout
+ARTIFACT_FORMAT = 4
+MANIFEST_FILE = "manifest.json"
+# Uncompressed Arrow IPC, so the catalog columns are memory-mapped rather than unpickled
+CATALOG_FILE = "catalog.arrow"
+# TF-IDF terms in column order; only read when new text has to be transformed
+VOCABULARY_FILE = "vocabulary.json"
+
+# Re-derive IDF weights once this fraction of the catalog was ingested with stale ones
+IDF_REFRESH_FRACTION = 0.1
+
+
+def catalog_signature(path):
+    # Cheap change detector for the CSV on disk (no need to re-read it)
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def mapping_signature(emotion_genre_map):
+    return tuple((emotion, tuple(genres)) for emotion, genres in emotion_genre_map.items())
+
+
+def index_signature(catalog_path, emotion_genre_map):
+    key = repr((catalog_signature(catalog_path), mapping_signature(emotion_genre_map)))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def load_catalog(path):
+    df = read_catalog(path)
+    # Lowercase genre column for consistent matching
+    df['Genre'] = lower_categories(df['Genre'])
+    return df
+
+
+def _rank_by_centroid(vectors):
+    # Order rows by cosine similarity to the mean vector of the group, scored and
+    # ordered exactly like recommend_batch: rounded scores, ties to the later row
+    n_rows = vectors.shape[0]
+    centroid = sp.csr_matrix(np.full((1, n_rows), 1.0 / n_rows)) @ vectors
+    similarities = (normalize_rows(centroid) @ vectors.T).toarray()
+    order, _ = top_k(similarities, n_rows)
+    return order[0], similarities[0]
+
+
+def _pack(arrays, keys):
+    # Concatenate variable-length int arrays into one flat array plus offsets
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    for i, key in enumerate(keys):
+        offsets[i + 1] = offsets[i] + len(arrays[key])
+    flat = np.concatenate([arrays[key] for key in keys]) if keys else np.empty(0)
+    return flat.astype(np.int64), offsets
+
+
+def _unpack(flat, offsets, keys):
+    return {key: flat[offsets[i]:offsets[i + 1]] for i, key in enumerate(keys)}
+
+
+class MovieIndex:
+    """TF-IDF matrix plus a fully ranked movie list for every mapped emotion.
+
+    Everything a recommendation depends on is a function of the catalog and
+    the emotion -> genre mapping only, so it is computed once (``build``) and
+    ``recommend_movies`` just slices the first ``top_n`` rows of a table.
+    A built index can be written to disk with ``save`` and memory-mapped back
+    with ``load`` so worker processes share the same pages. ``upsert`` adds or
+    edits movies against the fitted vocabulary without refitting TF-IDF.
+    """
+
+    def __init__(self, df, tfidf_matrix, genre_index, rankings, fallbacks, affinity=None,
+                 signature=None, vocabulary=None, idf=None, tfidf=None, version=0, stale_rows=0, path=None):
+        self.df = df
+        self.results = df[RESULT_COLUMNS]
+        self.tfidf_matrix = tfidf_matrix
+        self.genre_index = genre_index
+        self.rankings = rankings
+        self.fallbacks = fallbacks
+        self.affinity = affinity
+        self.signature = signature
+        self._vocabulary = vocabulary
+        self._idf = idf
+        self._tfidf = tfidf
+        # Artifact directory this index was loaded from, if any
+        self.path = path
+        # Bumped by every upsert; stale_rows counts rows ingested since IDF was last derived
+        self.version = version
+        self.stale_rows = stale_rows
+        self._title_rows = None
+        self._centroids = None
+        self._backends = {}
+
+    @classmethod
+    def build(cls, df, emotion_genre_map, signature=None):
+        # scikit-learn is only needed to fit or transform, not to serve a loaded artifact
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        # TF-IDF setup
+        tfidf = TfidfVectorizer(stop_words='english')
+        tfidf_matrix = tfidf.fit_transform(df['Description'].fillna(''))
+        index = cls(df, tfidf_matrix, GenreIndex(df['Genre']), {}, {},
+                    signature=signature, tfidf=tfidf)
+        index._build_rankings(emotion_genre_map)
+        return index
+
+    def _build_rankings(self, emotion_genre_map):
+        # Emotion x movie affinity: 1 + cosine to the emotion's centroid for its candidate
+        # movies, 0 elsewhere, so any candidate outranks every non-candidate
+        self.affinity = np.zeros((len(emotion_genre_map), len(self.df)), dtype=np.float32)
+        for i, emotion in enumerate(emotion_genre_map):
+            rows, similarities, fallback = self._build_ranking(emotion, emotion_genre_map)
+            self.rankings[emotion] = rows
+            self.fallbacks[emotion] = fallback
+            self.affinity[i, rows] = 1.0 + similarities
+
+    @property
+    def tfidf(self):
+        # Only rebuilt from the stored vocabulary when new text must be transformed
+        if self._tfidf is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            if self._vocabulary is None:
+                self._vocabulary = self._read_vocabulary()
+            self._tfidf = TfidfVectorizer(stop_words='english', vocabulary=self._vocabulary)
+            self._tfidf.idf_ = np.asarray(self._idf)
+        return self._tfidf
+
+    def _read_vocabulary(self):
+        with open(os.path.join(self.path, VOCABULARY_FILE), encoding="utf-8") as f:
+            terms = json.load(f)
+        if len(terms) != self.tfidf_matrix.shape[1]:
+            raise ValueError(f"{self.path} was rebuilt with a different vocabulary; reload the index")
+        return {term: col for col, term in enumerate(terms)}
+
+    @property
+    def emotions(self):
+        return list(self.rankings)
+
+    @property
+    def title_rows(self):
+        if self._title_rows is None:
+            self._title_rows = {title: row for row, title in enumerate(self.df['Movie_Title'])}
+        return self._title_rows
+
+    def emotion_centroids(self):
+        # Mean TF-IDF vector of each emotion's candidate rows (emotions x terms), plus the
+        # row-normalised membership matrix (emotions x movies) it was averaged with
+        if self._centroids is None:
+            emotions = self.emotions
+            sizes = np.array([len(self.rankings[e]) for e in emotions], dtype=np.int64)
+            indptr = np.zeros(len(emotions) + 1, dtype=np.int64)
+            np.cumsum(sizes, out=indptr[1:])
+            indices = np.concatenate([np.sort(self.rankings[e]) for e in emotions])
+            data = np.repeat(1.0 / np.maximum(sizes, 1), sizes)
+            members = sp.csr_matrix((data, indices, indptr), shape=(len(emotions), self.tfidf_matrix.shape[0]))
+            self._centroids = (members @ self.tfidf_matrix, members)
+        return self._centroids
+
+    def similarity_backend(self, name='exact', **params):
+        # Built on first use and kept for the lifetime of this index
+        key = (name, tuple(sorted(params.items())))
+        if key not in self._backends:
+            self._backends[key] = make_backend(name, self.tfidf_matrix, **params)
+        return self._backends[key]
+
+    def genre_rows(self, target_genres):
+        return self.genre_index.rows_for(target_genres)
+
+    def _build_ranking(self, emotion, emotion_genre_map):
+        # Step 1: Genre-based filtering
+        rows = self.genre_rows(emotion_genre_map[emotion])
+        fallback = FALLBACK_NONE
+
+        # Fallback 1: Try neutral emotion genres if current emotion gives no matches
+        if rows.size == 0 and emotion != 'neutral' and 'neutral' in emotion_genre_map:
+            rows = self.genre_rows(emotion_genre_map['neutral'])
+            fallback = FALLBACK_NEUTRAL
+
+        # Fallback 2: If still empty, rank the whole catalog by global TF-IDF similarity
+        if rows.size == 0:
+            order, similarities = _rank_by_centroid(self.tfidf_matrix)
+            return order, similarities[order], FALLBACK_GLOBAL
+
+        # Step 2: Description-based ranking within filtered subset
+        order, similarities = _rank_by_centroid(self.tfidf_matrix[rows])
+        return rows[order], similarities[order], fallback
+
+    def upsert(self, movies, emotion_genre_map):
+        # movies: catalog rows keyed by Movie_Title; known titles are edited in place,
+        # new ones appended. Only their descriptions are transformed (fitted vocabulary
+        # and IDF); rankings are re-derived from the stored matrix, which needs no refit.
+        movies = movies.reset_index(drop=True)
+        movies['Genre'] = movies['Genre'].astype('category')
+        movies['Genre'] = lower_categories(movies['Genre'])
+        movies = movies.drop_duplicates('Movie_Title', keep='last')
+
+        existing = movies['Movie_Title'].map(self.title_rows)
+        edited = existing.notna().to_numpy()
+        n_rows = len(self.df)
+        edit_rows = existing[edited].to_numpy(dtype=np.int64)
+        new_rows = np.arange(n_rows, n_rows + int((~edited).sum()), dtype=np.int64)
+        rows = np.empty(len(movies), dtype=np.int64)
+        rows[edited] = edit_rows
+        rows[~edited] = new_rows
+
+        # Stack the transformed rows under the old matrix and pick each row's latest version
+        vectors = self.tfidf.transform(movies['Description'].fillna(''))
+        pick = np.concatenate([np.arange(n_rows, dtype=np.int64), np.zeros(len(new_rows), dtype=np.int64)])
+        pick[rows] = n_rows + np.arange(len(movies))
+        tfidf_matrix = sp.vstack([self.tfidf_matrix, vectors], format='csr')[pick]
+
+        old_genres = [self.df['Genre'].iat[row] for row in edit_rows] + [None] * len(new_rows)
+        new_genres = movies['Genre'].iloc[np.r_[np.flatnonzero(edited), np.flatnonzero(~edited)]]
+        self.genre_index.update(np.r_[edit_rows, new_rows], old_genres, new_genres)
+
+        # Categoricals only concatenate as categoricals when they share categories
+        df = self.df.copy()
+        genres = df['Genre'].cat.categories.union(movies['Genre'].cat.categories)
+        df['Genre'] = df['Genre'].cat.set_categories(genres)
+        movies['Genre'] = movies['Genre'].cat.set_categories(genres)
+        columns = [c for c in df.columns if c in movies.columns]
+        df.loc[edit_rows, columns] = movies.loc[edited, columns].to_numpy()
+        appended = movies.loc[~edited].reindex(columns=df.columns).set_axis(new_rows.astype(df.index.dtype))
+        df = pd.concat([df, appended.astype(df.dtypes.to_dict())])
+
+        self.df = df
+        self.results = df[RESULT_COLUMNS]
+        self.tfidf_matrix = tfidf_matrix
+        self._title_rows = self._centroids = None
+        self._backends = {}
+        self.version += 1
+        self.stale_rows += len(movies)
+        if self.stale_rows >= IDF_REFRESH_FRACTION * len(df):
+            self.refresh_idf()
+        self._build_rankings(emotion_genre_map)
+        return edit_rows, new_rows
+
+    def refresh_idf(self):
+        # Recompute document frequencies from the matrix's non-zeros and re-weight every
+        # row in place of a refit: tf-idf / old idf * new idf, then re-normalise
+        matrix = self.tfidf_matrix.tocsr()
+        n_rows = matrix.shape[0]
+        doc_freq = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        idf = np.log((1 + n_rows) / (1 + doc_freq)) + 1
+        scale = idf / np.asarray(self.tfidf.idf_)
+        matrix = sp.csr_matrix((matrix.data * scale[matrix.indices], matrix.indices, matrix.indptr),
+                               shape=matrix.shape)
+        self.tfidf_matrix = normalize_rows(matrix).tocsr()
+        self._idf = idf
+        self.tfidf.idf_ = idf
+        self._centroids = None
+        self._backends = {}
+        self.stale_rows = 0
+
+    def top(self, emotion, top_n=5):
+        return self.results.iloc[self.rankings[emotion][:top_n]]
+
+    def top_blended(self, weights, top_n=5):
+        # weights: one probability per emotion, in ``self.emotions`` order. The blended
+        # ranking is a single dense matrix-vector product over the affinity matrix.
+        scores = np.asarray(weights, dtype=np.float32) @ self.affinity
+        rows, top_scores = top_k(scores[None, :], top_n)
+        return self.results.iloc[rows[0][top_scores[0] > 0]]
+
+    def save(self, path):
+        # Write into a scratch directory first so readers never see a half-written artifact
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        matrix = self.tfidf_matrix.tocsr()
+        np.save(os.path.join(tmp_path, "tfidf_data.npy"), matrix.data)
+        np.save(os.path.join(tmp_path, "tfidf_indices.npy"), matrix.indices)
+        np.save(os.path.join(tmp_path, "tfidf_indptr.npy"), matrix.indptr)
+        np.save(os.path.join(tmp_path, "idf.npy"), np.asarray(self.tfidf.idf_))
+        np.save(os.path.join(tmp_path, "affinity.npy"), self.affinity)
+
+        emotions = list(self.rankings)
+        rankings, ranking_offsets = _pack(self.rankings, emotions)
+        np.save(os.path.join(tmp_path, "rankings.npy"), rankings)
+        np.save(os.path.join(tmp_path, "ranking_offsets.npy"), ranking_offsets)
+
+        genres = self.genre_index.genres()
+        postings, posting_offsets = _pack(self.genre_index.postings, genres)
+        np.save(os.path.join(tmp_path, "postings.npy"), postings)
+        np.save(os.path.join(tmp_path, "posting_offsets.npy"), posting_offsets)
+
+        feather.write_feather(self.df, os.path.join(tmp_path, CATALOG_FILE), compression='uncompressed')
+        vocabulary = self.tfidf.vocabulary_
+        with open(os.path.join(tmp_path, VOCABULARY_FILE), "w", encoding="utf-8") as f:
+            json.dump(sorted(vocabulary, key=vocabulary.get), f)
+
+        manifest = {
+            "format": ARTIFACT_FORMAT,
+            "signature": self.signature,
+            "shape": list(matrix.shape),
+            "emotions": emotions,
+            "fallbacks": [self.fallbacks[e] for e in emotions],
+            "genres": genres,
+            "version": self.version,
+            "stale_rows": self.stale_rows,
+        }
+        with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def read_manifest(path):
+        try:
+            with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("format") != ARTIFACT_FORMAT:
+            return None
+        return manifest
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        manifest = cls.read_manifest(path)
+        if manifest is None:
+            raise FileNotFoundError(f"No index artifact in {path}")
+
+        mmap_mode = 'r' if mmap else None
+
+        def array(name):
+            return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+        tfidf_matrix = sp.csr_matrix(
+            (array("tfidf_data.npy"), array("tfidf_indices.npy"), array("tfidf_indptr.npy")),
+            shape=tuple(manifest["shape"]), copy=False)
+
+        emotions = manifest["emotions"]
+        rankings = _unpack(array("rankings.npy"), array("ranking_offsets.npy"), emotions)
+        fallbacks = dict(zip(emotions, manifest["fallbacks"]))
+
+        # String columns stay backed by the mapped Arrow buffers
+        df = feather.read_table(os.path.join(path, CATALOG_FILE), memory_map=mmap).to_pandas()
+        genre_index = GenreIndex.from_postings(
+            _unpack(array("postings.npy"), array("posting_offsets.npy"), manifest["genres"]))
+
+        return cls(df, tfidf_matrix, genre_index, rankings, fallbacks, affinity=array("affinity.npy"),
+                   signature=manifest["signature"], idf=array("idf.npy"), version=manifest.get("version", 0),
+                   stale_rows=manifest.get("stale_rows", 0), path=path)
@@ -0,0 +1,33 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recommender import recommend
+from recommender.catalog import read_catalog
+
+# Incremental update: python -m recommender.ingest new_movies.csv
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add or edit movies without rebuilding the index.")
+    parser.add_argument("movies", help="CSV (or Parquet) of movies to add; known titles are updated")
+    parser.add_argument("--catalog", default=recommend.CATALOG_PATH, help="Movie catalog CSV")
+    parser.add_argument("--index", default=recommend.INDEX_DIR, help="Index artifact directory")
+    parser.add_argument("--refresh-idf", action="store_true", help="Re-derive IDF weights now")
+    args = parser.parse_args()
+
+    recommend.CATALOG_PATH = args.catalog
+    recommend.INDEX_DIR = args.index
+
+    start = time.perf_counter()
+    index = recommend.get_index()
+    loaded = time.perf_counter()
+    if args.refresh_idf:
+        index.refresh_idf()
+    edit_rows, new_rows = recommend.ingest_movies(read_catalog(args.movies))
+    elapsed = time.perf_counter() - loaded
+
+    print(f"✅ {len(new_rows)} added, {len(edit_rows)} updated in {elapsed:.2f}s "
+          f"(index ready in {loaded - start:.2f}s)")
+    print(f"🎉 Catalog version {index.version}: {len(index.df)} movies, "
+          f"{index.stale_rows} ingested since the last IDF refresh")
@@ -1,14 +1,19 @@
 import pandas as pd
+import logging
 import os
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+import sys
 
-# Load dataset
-df = pd.read_csv(os.path.join(os.path.dirname(__file__), "..", "data", "movies_with_posters.csv"))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recommender.index import MovieIndex, index_signature, load_catalog, FALLBACK_NEUTRAL, FALLBACK_GLOBAL
+from recommender.catalog import upsert_catalog
+from recommender.tracing import tracer
+from recommender.batch import recommend_batch, emotion_weights
+from recommender.sharded import ShardedRecommender, read_shard_manifest, save_shards
 
-# Lowercase genre column for consistent matching
-df['Genre'] = df['Genre'].str.lower()
+# Dataset and prebuilt index locations
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "movies_with_posters.csv")
+INDEX_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "index")
+SHARD_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "index_shards")
 
 # Emotion to genre mapping
 emotion_genre_map = {
@@ -20,53 +25,123 @@ emotion_genre_map = {
     "neutral": ["adventure", "drama", "action"]
 }
 
-# TF-IDF setup
-tfidf = TfidfVectorizer(stop_words='english')
-tfidf_matrix = tfidf.fit_transform(df['Description'].fillna(''))
+# Similarity search used for request-time queries: 'exact' or 'ivf' (approximate)
+SIMILARITY_BACKEND = "exact"
+
+# Loaded on first use, not at import time
+_index = None
+_sharded = None
+
+
+def build_index(save=False):
+    # Fit TF-IDF and precompute the per-emotion ranking tables from the CSV
+    global _index
+    signature = index_signature(CATALOG_PATH, emotion_genre_map)
+    with tracer.stage("index.load_catalog"):
+        df = load_catalog(CATALOG_PATH)
+    with tracer.stage("index.build"):
+        _index = MovieIndex.build(df, emotion_genre_map, signature=signature)
+    tracer.event("index.built", movies=len(df), signature=signature)
+    if save:
+        with tracer.stage("index.save"):
+            _index.save(INDEX_DIR)
+    return _index
+
+
+def get_index():
+    global _index
+    signature = index_signature(CATALOG_PATH, emotion_genre_map)
+    if _index is not None and _index.signature == signature:
+        return _index
+
+    # Prefer the memory-mapped artifact when it was built from the same catalog and mapping
+    manifest = MovieIndex.read_manifest(INDEX_DIR)
+    if manifest is not None and manifest["signature"] == signature:
+        with tracer.stage("index.load"):
+            _index = MovieIndex.load(INDEX_DIR)
+        tracer.event("index.loaded", path=INDEX_DIR, signature=signature)
+        return _index
+
+    # Rebuild automatically when the CSV or the emotion mapping has changed
+    return build_index()
+
+
+def get_sharded(workers=None, n_shards=None, partition="rows"):
+    # Worker processes over the sharded index; re-sharded from the full index when stale
+    global _sharded
+    signature = index_signature(CATALOG_PATH, emotion_genre_map)
+    if _sharded is not None and _sharded.signature == signature:
+        return _sharded
+    if _sharded is not None:
+        _sharded.close()
+
+    manifest = read_shard_manifest(SHARD_DIR)
+    n_shards = n_shards or workers or os.cpu_count() or 1
+    if (manifest is None or manifest["signature"] != signature or manifest["partition"] != partition
+            or len(manifest["shards"]) != n_shards):
+        with tracer.stage("index.shard"):
+            save_shards(get_index(), SHARD_DIR, n_shards, partition)
+        tracer.event("index.sharded", path=SHARD_DIR, shards=n_shards, partition=partition)
+    _sharded = ShardedRecommender(SHARD_DIR, workers=workers)
+    return _sharded
+
+
+def ingest_movies(movies, save=True):
+    # Add or edit catalog rows (matched by Movie_Title) without refitting TF-IDF: the
+    # in-memory index, the catalog CSV/Parquet and the saved artifact are all updated
+    index = get_index()
+    edit_rows, new_rows = index.upsert(movies.copy(), emotion_genre_map)
+    upsert_catalog(CATALOG_PATH, movies)
+    index.signature = index_signature(CATALOG_PATH, emotion_genre_map)
+    if save:
+        index.save(INDEX_DIR)
+    return edit_rows, new_rows
+
 
 def recommend_movies(emotion, top_n=5):
+    # A DeepFace score dict ({'happy': 62.1, 'sad': 30.4, ...}) blends all emotions
+    if isinstance(emotion, dict):
+        return recommend_movies_blended(emotion, top_n)
+
     emotion = emotion.lower()
     if emotion not in emotion_genre_map:
         return pd.DataFrame()
 
-    target_genres = emotion_genre_map[emotion]
-
-    # Step 1: Genre-based filtering
-    def genre_matches(row_genres):
-        genres = [g.strip().lower() for g in row_genres.split(',')]
-        return any(g in target_genres for g in genres)
-
-    genre_filtered_df = df[df['Genre'].apply(genre_matches)]
-
-    # Fallback 1: Try neutral emotion genres if current emotion gives no matches
-    if genre_filtered_df.empty and emotion != 'neutral':
-        neutral_genres = emotion_genre_map['neutral']
-        genre_filtered_df = df[df['Genre'].apply(
-            lambda row: any(g.strip().lower() in neutral_genres for g in row.split(',')))]
-        print(f"[Fallback] No match for '{emotion}', used neutral genre fallback.")
-
-    # Fallback 2: If still empty, return top-N based on global TF-IDF similarity
-    if genre_filtered_df.empty:
-        avg_vector = tfidf_matrix.mean(axis=0)
-        avg_vector = np.asarray(avg_vector).reshape(1, -1)
-        similarities = cosine_similarity(avg_vector, tfidf_matrix).flatten()
-        top_indices = similarities.argsort()[::-1][:top_n]
-        print("[Fallback] No genre match, used global TF-IDF fallback.")
-        return df.iloc[top_indices][['Movie_Title', 'Genre', 'Poster_URL', 'Description', 'YouTube_URL','Rating']]
-
-    # Step 2: Description-based ranking within filtered subset
-    genre_indices = genre_filtered_df.index.tolist()
-    genre_vectors = tfidf_matrix[genre_indices]
-    avg_vector = genre_vectors.mean(axis=0)
-    avg_vector = np.asarray(avg_vector).reshape(1, -1)
-    similarities = cosine_similarity(avg_vector, genre_vectors).flatten()
-    top_filtered_indices = np.array(genre_indices)[similarities.argsort()[::-1][:top_n]]
-
-    recommended = df.loc[top_filtered_indices]
-    return recommended[['Movie_Title', 'Genre', 'Poster_URL', 'Description', 'YouTube_URL', 'Rating']]
+    with tracer.stage("recommend.index"):
+        index = get_index()
+    fallback = index.fallbacks[emotion]
+    if fallback in (FALLBACK_NEUTRAL, FALLBACK_GLOBAL):
+        # neutral: no genre match, used the neutral genres; global: ranked the whole catalog
+        tracer.event("recommend.fallback", emotion=emotion, fallback=fallback)
+
+    with tracer.stage("recommend.rank"):
+        return index.top(emotion, top_n)
+
+
+def recommend_movies_blended(emotion_scores, top_n=5):
+    # Rank against every emotion at once, weighted by its probability, so close
+    # scores (49/51%) give a stable mix instead of flipping between two lists
+    with tracer.stage("recommend.index"):
+        index = get_index()
+    weights = emotion_weights([emotion_scores], index.emotions)[0]
+    if not weights.any():
+        return pd.DataFrame()
+    with tracer.stage("recommend.rank_blended"):
+        return index.top_blended(weights, top_n)
+
+
+def recommend_movies_batch(emotions, top_n=5, exclude=None, backend=None):
+    # emotions: names, DeepFace-style score dicts, or probability vectors ordered like
+    # get_index().emotions. top_n may be given per item; exclude is one list of titles
+    # or row ids per item.
+    with tracer.stage("recommend.index"):
+        index = get_index()
+    with tracer.stage("recommend.batch"):
+        return recommend_batch(index, emotions, top_n=top_n, exclude=exclude,
+                               backend=backend or SIMILARITY_BACKEND)
 
 # CLI test
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     emotion = input("Enter emotion: ")
     print(recommend_movies(emotion))
-
@@ -0,0 +1,364 @@
+import heapq
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from recommender.batch import emotion_weights, _exclude_lists, _per_item
+from recommender.genre_index import GenreIndex, split_genres
+from recommender.index import ARTIFACT_FORMAT, MovieIndex, RESULT_COLUMNS, _pack, _unpack
+from recommender.similarity import SCORE_DECIMALS, normalize_rows, top_k
+
+# On-disk layout: a manifest plus one ordinary MovieIndex artifact per shard
+SHARD_FORMAT = 1
+MANIFEST_FILE = "shards.json"
+ROWS_FILE = "rows.npy"
+POSITIONS_FILE = "ranking_positions.npy"
+PARTITIONS = ("rows", "genre")
+
+
+def partition_rows(df, n_shards, partition="rows"):
+    # Sorted global row ids for each shard
+    n_rows = len(df)
+    if partition == "rows":
+        return [part.astype(np.int64) for part in np.array_split(np.arange(n_rows), n_shards)]
+    if partition != "genre":
+        raise ValueError(f"Unknown partition '{partition}' (expected one of {PARTITIONS})")
+
+    # Group by primary genre (split once per distinct genre string); a group larger than
+    # one shard's share is split, and the pieces go largest first to the least loaded shard
+    genres = df['Genre'].astype('category')
+    firsts = np.array([(split_genres(value) or [""])[0] for value in genres.cat.categories] + [""])
+    primary = firsts[genres.cat.codes.to_numpy()]
+    share = -(-n_rows // n_shards)
+    pieces = []
+    for genre in np.unique(primary):
+        rows = np.flatnonzero(primary == genre)
+        pieces += [rows[i:i + share] for i in range(0, len(rows), share)]
+    shards, loads = [[] for _ in range(n_shards)], np.zeros(n_shards, dtype=np.int64)
+    for piece in sorted(pieces, key=len, reverse=True):
+        shard = int(loads.argmin())
+        shards[shard].append(piece)
+        loads[shard] += len(piece)
+    return [np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64) for parts in shards]
+
+
+def shard_index(index, rows):
+    # A MovieIndex over just ``rows`` (kept in global order), plus each ranking entry's
+    # position in the full ranking so shard results can be merged back exactly
+    local = np.full(len(index.df), -1, dtype=np.int64)
+    local[rows] = np.arange(len(rows))
+    rankings, positions = {}, {}
+    for emotion, ranking in index.rankings.items():
+        mapped = local[np.asarray(ranking)]
+        keep = np.flatnonzero(mapped >= 0)
+        rankings[emotion] = mapped[keep]
+        positions[emotion] = keep
+    df = index.df.iloc[rows]
+    shard = MovieIndex(df, index.tfidf_matrix[rows], GenreIndex(df['Genre']), rankings,
+                       dict(index.fallbacks), affinity=np.ascontiguousarray(index.affinity[:, rows]),
+                       signature=index.signature, tfidf=index.tfidf, version=index.version,
+                       stale_rows=index.stale_rows)
+    return shard, positions
+
+
+def save_shards(index, path, n_shards, partition="rows"):
+    # Same scratch-directory swap as MovieIndex.save
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    shards = []
+    for i, rows in enumerate(partition_rows(index.df, n_shards, partition)):
+        name = f"shard-{i:03d}"
+        shard, positions = shard_index(index, rows)
+        shard.save(os.path.join(tmp_path, name))
+        np.save(os.path.join(tmp_path, name, ROWS_FILE), rows)
+        flat, _ = _pack(positions, index.emotions)
+        np.save(os.path.join(tmp_path, name, POSITIONS_FILE), flat)
+        shards.append({"dir": name, "rows": len(rows)})
+
+    manifest = {
+        "format": SHARD_FORMAT,
+        # Shards are MovieIndex artifacts: re-shard when that layout changes too
+        "artifact_format": ARTIFACT_FORMAT,
+        "signature": index.signature,
+        "partition": partition,
+        "rows": len(index.df),
+        "emotions": index.emotions,
+        "shards": shards,
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def read_shard_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != SHARD_FORMAT or manifest.get("artifact_format") != ARTIFACT_FORMAT:
+        return None
+    return manifest
+
+
+class Shard:
+    """One memory-mapped shard as seen by its worker process.
+
+    Every method answers in global row ids and returns, per query, the best
+    ``k`` hits with a merge key (higher is better; ties go to the later row, as
+    in the unsharded index) and the result rows needed to render them.
+    """
+
+    def __init__(self, path):
+        self.index = MovieIndex.load(path)
+        self.rows = np.load(os.path.join(path, ROWS_FILE), mmap_mode='r')
+        _, offsets = _pack(self.index.rankings, self.index.emotions)
+        self.positions = _unpack(np.load(os.path.join(path, POSITIONS_FILE), mmap_mode='r'), offsets,
+                                 self.index.emotions)
+        sizes = [len(self.index.rankings[e]) for e in self.index.emotions]
+        indices = np.concatenate([np.sort(self.index.rankings[e]) for e in self.index.emotions])
+        indptr = np.concatenate([[0], np.cumsum(sizes)])
+        self.members = sp.csr_matrix((np.ones(len(indices)), indices, indptr),
+                                     shape=(len(sizes), len(self.rows)))
+
+    def info(self):
+        # Candidate count per emotion, for routing, and the emotion's share of the centroid
+        return {"rows": len(self.rows), "members": np.diff(self.members.indptr),
+                "centroid_sums": self.members @ self.index.tfidf_matrix}
+
+    def _reply(self, local_rows, keys):
+        # local_rows/keys: (queries x k), -1 padded -> global rows, keys and their result rows
+        found = local_rows >= 0
+        unique = np.unique(local_rows[found])
+        global_rows = np.where(found, np.asarray(self.rows)[np.where(found, local_rows, 0)], -1)
+        return global_rows, np.where(found, keys, -np.inf), np.asarray(self.rows)[unique], \
+            self.index.results.iloc[unique]
+
+    def _banned(self, exclude):
+        # Titles or global row ids -> (query, local row) pairs for this shard
+        items, rows = [], []
+        for i, movies in enumerate(exclude):
+            for movie in movies or ():
+                if isinstance(movie, str):
+                    row = self.index.title_rows.get(movie)
+                else:
+                    row = int(np.searchsorted(self.rows, int(movie)))
+                    row = row if row < len(self.rows) and self.rows[row] == int(movie) else None
+                if row is not None:
+                    items.append(i)
+                    rows.append(row)
+        return np.asarray(items, dtype=np.int64), np.asarray(rows, dtype=np.int64)
+
+    def search(self, queries, weights, k, exclude, backend):
+        allowed = sp.csr_matrix(weights > 0, dtype=np.float64) @ self.members
+        rows, scores = self.index.similarity_backend(backend).search(queries, k, allowed, self._banned(exclude))
+        return self._reply(rows, scores.round(SCORE_DECIMALS)) + (scores,)
+
+    def top(self, emotion, k):
+        ranking = self.index.rankings[emotion][:k]
+        keys = -np.asarray(self.positions[emotion][:k], dtype=np.float64)
+        return self._reply(np.asarray(ranking)[None, :], keys[None, :])
+
+    def top_blended(self, weights, k):
+        scores = np.asarray(weights, dtype=np.float32) @ self.index.affinity
+        rows, top_scores = top_k(scores[None, :], k)
+        rows[top_scores <= 0] = -1
+        return self._reply(rows, top_scores.round(SCORE_DECIMALS).astype(np.float64))
+
+
+def _serve(paths, conn):
+    # Worker process: load its shards, then answer (shard, method, args) calls until told to stop
+    try:
+        shards = {path: Shard(path) for path in paths}
+        conn.send(("ok", None))
+    except Exception as e:
+        conn.send(("error", repr(e)))
+        return
+    while True:
+        calls = conn.recv()
+        if calls is None:
+            break
+        try:
+            conn.send(("ok", [getattr(shards[path], method)(*args) for path, method, args in calls]))
+        except Exception as e:
+            conn.send(("error", repr(e)))
+
+
+class ShardedRecommender:
+    """Recommendations over a sharded index, scored in parallel by worker processes.
+
+    Each worker memory-maps only its own shards (row ranges or genre groups of
+    the catalog, see ``save_shards``), so no process holds the whole TF-IDF
+    matrix or DataFrame. A query is sent only to the shards holding one of its
+    emotions' candidates; each returns its local top-k and the coordinator
+    merges them with a heap, reproducing the unsharded index's results.
+    """
+
+    def __init__(self, path, workers=None):
+        manifest = read_shard_manifest(path)
+        if manifest is None:
+            raise FileNotFoundError(f"No sharded index in {path}")
+        self.manifest = manifest
+        self.signature = manifest["signature"]
+        self.emotions = manifest["emotions"]
+        paths = [os.path.join(path, shard["dir"]) for shard in manifest["shards"]]
+        workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+        self._lock = threading.Lock()
+
+        # spawn: workers start clean instead of inheriting the coordinator's memory
+        context = multiprocessing.get_context("spawn")
+        self._workers = []
+        for i in range(workers):
+            owned = paths[i::workers]
+            parent, child = context.Pipe()
+            process = context.Process(target=_serve, args=(owned, child), daemon=True)
+            process.start()
+            self._workers.append((process, parent, owned))
+        for _, conn, _ in self._workers:
+            status, error = conn.recv()
+            if status != "ok":
+                self.close()
+                raise RuntimeError(f"Shard worker failed to load: {error}")
+
+        info = self._call([(shard, "info", ()) for shard in paths])
+        self.paths = paths
+        self.members = np.vstack([shard["members"] for shard in info])
+        # Same centroids as MovieIndex.emotion_centroids, summed across shards
+        sizes = self.members.sum(axis=0)
+        self.centroids = sp.diags(1.0 / np.maximum(sizes, 1)) @ sum(shard["centroid_sums"] for shard in info)
+
+    def _call(self, calls):
+        # Send every worker its share of (shard, method, args) calls, then collect in order
+        with self._lock:
+            pending = []
+            for _, conn, owned in self._workers:
+                mine = [call for call in calls if call[0] in owned]
+                if mine:
+                    conn.send(mine)
+                    pending.append((conn, mine))
+            results = {}
+            for conn, mine in pending:
+                status, value = conn.recv()
+                if status != "ok":
+                    raise RuntimeError(f"Shard worker failed: {value}")
+                results.update({id(call): result for call, result in zip(mine, value)})
+            return [results[id(call)] for call in calls]
+
+    @staticmethod
+    def _merge(replies, n_queries, top_n):
+        # k-way heap merge of each shard's best-first hits per query
+        rows = np.concatenate([reply[2] for reply in replies]) if replies else np.empty(0, dtype=np.int64)
+        frame = pd.concat([reply[3] for reply in replies]) if replies else None
+        where = dict(zip(rows.tolist(), range(len(rows))))
+        frames = []
+        for q in range(n_queries):
+            streams = [zip(keys[q].tolist(), hits[q].tolist()) for hits, keys, *_ in replies]
+            best = [row for key, row in heapq.merge(*streams, reverse=True) if row >= 0]
+            picked = best[:top_n[q]]
+            frames.append(frame.iloc[[where[row] for row in picked]] if picked
+                          else pd.DataFrame(columns=RESULT_COLUMNS))
+        return frames
+
+    def _route(self, weights):
+        # A shard is needed only if it holds candidates of an emotion some query weights
+        return ((weights > 0).astype(np.int64) @ (self.members > 0).T).any(axis=0)
+
+    def recommend_batch(self, emotions, top_n=5, exclude=None, backend='exact'):
+        # Same inputs as recommend_movies_batch; one DataFrame per query
+        weights = emotion_weights(emotions, self.emotions)
+        n_queries = weights.shape[0]
+        top_n = [int(n) for n in _per_item(top_n, n_queries, 5)]
+        exclude = _exclude_lists(exclude, n_queries, self.manifest["rows"])
+        queries = normalize_rows(sp.csr_matrix(weights) @ self.centroids)
+        k = max(top_n, default=0)
+        calls = [(shard, "search", (queries, weights, k, exclude, backend))
+                 for shard, needed in zip(self.paths, self._route(weights)) if needed]
+        if not calls or k <= 0:
+            return [pd.DataFrame(columns=RESULT_COLUMNS) for _ in range(n_queries)]
+        return self._merge(self._call(calls), n_queries, top_n)
+
+    def top(self, emotion, top_n=5):
+        emotion = emotion.lower()
+        if emotion not in self.emotions:
+            return pd.DataFrame()
+        e = self.emotions.index(emotion)
+        calls = [(shard, "top", (emotion, top_n)) for i, shard in enumerate(self.paths) if self.members[i, e]]
+        return self._merge(self._call(calls), 1, [top_n])[0]
+
+    def top_blended(self, weights, top_n=5):
+        calls = [(shard, "top_blended", (weights, top_n)) for shard in self.paths]
+        return self._merge(self._call(calls), 1, [top_n])[0]
+
+    def close(self):
+        for process, conn, _ in self._workers:
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Shard the current index and compare single-query latency and results with the unsharded one:
+# python -m recommender.sharded --shards 4 --partition genre
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from recommender import recommend
+
+    parser = argparse.ArgumentParser(description="Build the sharded index and check it against the full one.")
+    parser.add_argument("--shards", type=int, default=os.cpu_count(), help="Number of shards")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per shard, up to the cores)")
+    parser.add_argument("--partition", choices=PARTITIONS, default="rows")
+    parser.add_argument("--queries", type=int, default=60, help="Single-emotion and blended queries to time")
+    parser.add_argument("--top-n", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sharded = recommend.get_sharded(args.workers, args.shards, args.partition)
+    print(f"✅ {len(sharded.paths)} {args.partition} shards on {len(sharded._workers)} workers "
+          f"ready in {time.perf_counter() - start:.2f}s")
+
+    index = recommend.get_index()
+    rng = np.random.default_rng(0)
+    queries = [sharded.emotions[i % len(sharded.emotions)] if i % 2 else
+               dict(zip(sharded.emotions, rng.random(len(sharded.emotions)).tolist()))
+               for i in range(args.queries)]
+    timings = {"unsharded": [], "sharded": []}
+    mismatches = 0
+    for query in queries:
+        start = time.perf_counter()
+        expected = recommend.recommend_batch(index, [query], top_n=args.top_n).frame(0)
+        timings["unsharded"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        got = sharded.recommend_batch([query], top_n=args.top_n)[0]
+        timings["sharded"].append(time.perf_counter() - start)
+        mismatches += list(expected.index) != list(got.index)
+    sharded.close()
+
+    for name, seconds in timings.items():
+        ms = np.array(seconds) * 1000
+        print(f"⏱️ {name:<10} p50 {np.percentile(ms, 50):.2f} ms   p95 {np.percentile(ms, 95):.2f} ms")
+    print("🎉 Sharded results match" if not mismatches else f"❌ {mismatches} queries differ")
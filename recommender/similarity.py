@@ -0,0 +1,247 @@
+import os
+import sys
+import time
+import numpy as np
+import scipy.sparse as sp
+
+# Upper bound on the dense (queries x movies) score block scored at once
+CHUNK_CELLS = 1 << 24
+
+# Scores are compared at this precision so float noise cannot reorder tied movies
+SCORE_DECIMALS = 9
+
+
+def normalize_rows(matrix):
+    # L2-normalise a sparse query matrix so dot products against TF-IDF rows are cosines
+    matrix = sp.csr_matrix(matrix)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    norms[norms == 0] = 1.0
+    return sp.diags(1.0 / norms) @ matrix
+
+
+def top_k(scores, k):
+    # Row-wise top-k of a dense score block: argpartition, then sort only k columns
+    n_cols = scores.shape[1]
+    k = min(k, n_cols)
+    rounded = scores.round(SCORE_DECIMALS)
+    if k < n_cols:
+        top = np.argpartition(-rounded, k - 1, axis=1)[:, :k]
+        # argpartition keeps an arbitrary subset of the rows tied at the cut-off; keep the
+        # later ones instead, so the result does not depend on how the rows were split
+        kth = np.take_along_axis(rounded, top, axis=1).min(axis=1)
+        tied = (rounded == kth[:, None]).sum(axis=1)
+        kept = (np.take_along_axis(rounded, top, axis=1) == kth[:, None]).sum(axis=1)
+        for i in np.flatnonzero((tied > kept) & np.isfinite(kth)):
+            above = np.flatnonzero(rounded[i] > kth[i])
+            at = np.flatnonzero(rounded[i] == kth[i])
+            top[i] = np.concatenate([above, at[len(at) - (k - len(above)):]])
+    else:
+        top = np.broadcast_to(np.arange(n_cols), scores.shape)
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    # Highest score first, exact ties to the later row
+    order = np.lexsort((-top, -np.take_along_axis(rounded, top, axis=1)), axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+def _pad(rows, scores, k):
+    if rows.shape[1] == k:
+        return rows, scores
+    pad = k - rows.shape[1]
+    rows = np.pad(rows, ((0, 0), (0, pad)), constant_values=-1)
+    scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+    return rows, scores
+
+
+class ExactBackend:
+    """Brute-force cosine over every catalog row (the original behaviour).
+
+    ``search`` takes L2-normalised CSR queries, a ``k``, an optional
+    (queries x movies) sparse matrix whose non-zeros mark allowed rows and
+    optional banned ``(query, row)`` pairs. It returns ``(rows, scores)``,
+    each (queries x k), best first, padded with -1 / -inf.
+    """
+
+    name = 'exact'
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def search(self, queries, k, allowed=None, banned=None):
+        n_queries, n_rows = queries.shape[0], self.matrix.shape[0]
+        rows = np.full((n_queries, k), -1, dtype=np.int64)
+        scores = np.full((n_queries, k), -np.inf)
+        if k <= 0 or n_rows == 0:
+            return rows, scores
+
+        chunk = max(1, CHUNK_CELLS // n_rows)
+        for start in range(0, n_queries, chunk):
+            stop = min(start + chunk, n_queries)
+            block = (queries[start:stop] @ self.matrix.T).toarray()
+            if allowed is not None:
+                block[allowed[start:stop].toarray() == 0] = -np.inf
+            if banned is not None:
+                in_chunk = (banned[0] >= start) & (banned[0] < stop)
+                block[banned[0][in_chunk] - start, banned[1][in_chunk]] = -np.inf
+            top, top_scores = _pad(*top_k(block, k), k)
+            rows[start:stop], scores[start:stop] = top, top_scores
+
+        rows[~np.isfinite(scores)] = -1
+        return rows, scores
+
+
+class IVFBackend:
+    """Cluster-pruned approximate cosine search (inverted file index).
+
+    TF-IDF rows are reduced with a Gaussian random projection, grouped by
+    spherical k-means into ``n_lists`` clusters, and stored as sorted row
+    id lists per cluster. A query probes its ``n_probe`` nearest clusters,
+    drops rows outside its allowed (genre) set before scoring, and re-ranks
+    the survivors with exact cosine. Probing widens until at least ``k``
+    allowed rows are found, so narrow genre filters still fill the page.
+    """
+
+    name = 'ivf'
+
+    def __init__(self, matrix, n_lists=None, n_probe=8, dim=128, iterations=10, seed=0):
+        self.matrix = sp.csr_matrix(matrix)
+        n_rows, n_terms = self.matrix.shape
+        self.n_lists = max(1, min(n_rows, n_lists or int(np.sqrt(n_rows))))
+        self.n_probe = n_probe
+        rng = np.random.default_rng(seed)
+
+        self.projection = (rng.standard_normal((n_terms, dim)) / np.sqrt(dim)).astype(np.float32)
+        points = self._project(self.matrix)
+
+        centroids = points[rng.choice(n_rows, self.n_lists, replace=False)] if n_rows else points
+        for _ in range(iterations):
+            assignment = self._nearest(points, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, points)
+            sizes = np.bincount(assignment, minlength=self.n_lists)
+            # Re-seed empty clusters from random rows
+            empty = np.flatnonzero(sizes == 0)
+            sums[empty] = points[rng.choice(n_rows, len(empty))]
+            centroids = _unit(sums)
+        self.centroids = centroids
+
+        assignment = self._nearest(points, centroids)
+        # Stable sort keeps each list in ascending row order
+        self.lists = np.argsort(assignment, kind='stable').astype(np.int64)
+        self.offsets = np.zeros(self.n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=self.n_lists), out=self.offsets[1:])
+
+    def _project(self, vectors):
+        return _unit(np.asarray(vectors @ self.projection, dtype=np.float32))
+
+    def _nearest(self, points, centroids):
+        assignment = np.empty(len(points), dtype=np.int64)
+        chunk = max(1, CHUNK_CELLS // max(len(centroids), 1))
+        for start in range(0, len(points), chunk):
+            assignment[start:start + chunk] = (points[start:start + chunk] @ centroids.T).argmax(axis=1)
+        return assignment
+
+    def _candidates(self, probe_order, n_probe, allowed_rows, banned_rows):
+        lists = [self.lists[self.offsets[c]:self.offsets[c + 1]] for c in probe_order[:n_probe]]
+        # Sorted so exact ties break by row id, as in ExactBackend
+        candidates = np.sort(np.concatenate(lists)) if lists else np.empty(0, dtype=np.int64)
+        if allowed_rows is not None:
+            if not len(allowed_rows):
+                return allowed_rows
+            # Sorted-array intersection: cost follows the probed lists, not the catalog
+            position = np.searchsorted(allowed_rows, candidates).clip(max=len(allowed_rows) - 1)
+            candidates = candidates[allowed_rows[position] == candidates]
+        if banned_rows is not None and len(banned_rows):
+            candidates = candidates[~np.isin(candidates, banned_rows)]
+        return candidates
+
+    def search(self, queries, k, allowed=None, banned=None):
+        n_queries = queries.shape[0]
+        rows = np.full((n_queries, k), -1, dtype=np.int64)
+        scores = np.full((n_queries, k), -np.inf)
+        if k <= 0 or self.matrix.shape[0] == 0:
+            return rows, scores
+
+        probe_orders = np.argsort(-(self._project(queries) @ self.centroids.T), axis=1)
+        if allowed is not None:
+            allowed = sp.csr_matrix(allowed)
+            allowed.eliminate_zeros()
+            allowed.sort_indices()
+        for i in range(n_queries):
+            allowed_rows = None
+            if allowed is not None:
+                allowed_rows = allowed.indices[allowed.indptr[i]:allowed.indptr[i + 1]].astype(np.int64)
+            banned_rows = banned[1][banned[0] == i] if banned is not None else None
+
+            n_probe = self.n_probe
+            candidates = self._candidates(probe_orders[i], n_probe, allowed_rows, banned_rows)
+            while len(candidates) < k and n_probe < self.n_lists:
+                n_probe = min(self.n_lists, n_probe * 2)
+                candidates = self._candidates(probe_orders[i], n_probe, allowed_rows, banned_rows)
+            if not len(candidates):
+                continue
+
+            block = (queries[i] @ self.matrix[candidates].T).toarray()
+            top, top_scores = top_k(block, k)
+            found = top.shape[1]
+            rows[i, :found], scores[i, :found] = candidates[top[0]], top_scores[0]
+        return rows, scores
+
+
+def _unit(points):
+    norms = np.linalg.norm(points, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return points / norms
+
+
+BACKENDS = {
+    ExactBackend.name: ExactBackend,
+    IVFBackend.name: IVFBackend,
+}
+
+
+def make_backend(name, matrix, **params):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown similarity backend '{name}' (expected one of {sorted(BACKENDS)})")
+    return BACKENDS[name](matrix, **params)
+
+
+def recall_at_k(approx_rows, exact_rows, k):
+    # Fraction of the exact top-k (ignoring padding) that the approximate search also returned
+    hits, total = 0, 0
+    for approx, exact in zip(approx_rows[:, :k], exact_rows[:, :k]):
+        exact = exact[exact >= 0]
+        hits += np.isin(exact, approx).sum()
+        total += len(exact)
+    return hits / total if total else 1.0
+
+
+def evaluate(index, backend, queries, k=10, allowed=None):
+    exact = index.similarity_backend(ExactBackend.name)
+    start = time.perf_counter()
+    exact_rows, _ = exact.search(queries, k, allowed)
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    approx_rows, _ = backend.search(queries, k, allowed)
+    approx_time = time.perf_counter() - start
+    return {
+        'backend': backend.name,
+        'k': k,
+        'queries': queries.shape[0],
+        'recall': recall_at_k(approx_rows, exact_rows, k),
+        'exact_seconds': exact_time,
+        'approx_seconds': approx_time,
+    }
+
+
+# Report recall@k of the approximate backend against exact search on the current catalog
+if __name__ == "__main__":
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from recommender.recommend import get_index
+
+    index = get_index()
+    movies = index.tfidf_matrix
+    sample = np.random.default_rng(0).choice(movies.shape[0], min(200, movies.shape[0]), replace=False)
+    queries = normalize_rows(movies[sample])
+    report = evaluate(index, index.similarity_backend(IVFBackend.name), queries)
+    print(f"recall@{report['k']} over {report['queries']} movie queries: {report['recall']:.3f} "
+          f"(exact {report['exact_seconds'] * 1000:.1f} ms, ivf {report['approx_seconds'] * 1000:.1f} ms)")
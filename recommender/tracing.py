@@ -0,0 +1,162 @@
+import io
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("emotion_recommender")
+
+# Finished requests and events kept in memory for the debug panel
+HISTORY = 50
+# Set TRACE_JSONL to a file path to append every finished request as one JSON line
+TRACE_JSONL = os.environ.get("TRACE_JSONL")
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+class _Profile:
+    # Thin wrapper so both profilers start, stop and report the same way
+    def __init__(self, kind):
+        self.kind = kind
+        if kind == "pyinstrument":
+            from pyinstrument import Profiler
+            self.profiler = Profiler()
+            self.profiler.start()
+        else:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self, limit=30):
+        if self.kind == "pyinstrument":
+            self.profiler.stop()
+            return self.profiler.output_text(unicode=True)
+        import pstats
+        self.profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+class Tracer:
+    """Process-wide stage timers, counters and structured events.
+
+    ``stage`` blocks are aggregated per name and, inside ``begin_request`` /
+    ``end_request``, also recorded in that request's breakdown; the last
+    ``history`` requests are kept for the debug panel. Cheap enough to leave on:
+    a stage costs two ``perf_counter`` calls and a lock.
+    """
+
+    def __init__(self, history=HISTORY, jsonl_path=TRACE_JSONL):
+        self.jsonl_path = jsonl_path
+        self.requests = deque(maxlen=history)
+        self.events = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name):
+        request = getattr(self._local, "request", None)
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.depth = depth
+            self.observe(name, elapsed)
+            if request is not None:
+                request["stages"].append({"stage": name, "ms": elapsed * 1000, "depth": depth})
+
+    def observe(self, name, seconds):
+        # Aggregate a duration measured elsewhere, e.g. across awaits in an event loop
+        with self._lock:
+            count, total = self._stages.get(name, (0, 0.0))
+            self._stages[name] = (count + 1, total + seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def event(self, name, level=logging.INFO, **fields):
+        # Structured replacement for ad-hoc prints: counted, kept for the panel and logged as JSON
+        record = {"event": name, "time": time.time(), **fields}
+        self.count(f"event.{name}")
+        with self._lock:
+            self.events.append(record)
+        logger.log(level, json.dumps(record, default=str))
+
+    def begin_request(self, name, profile=None):
+        # One request per thread; a request left open (e.g. by st.stop) is simply replaced
+        self._local.request = {"name": name, "start": time.time(), "stages": [], "profile": None}
+        self._local.started = time.perf_counter()
+        self._local.depth = 0
+        self._local.profile = _Profile(profile) if profile in PROFILERS else None
+
+    def end_request(self, **fields):
+        request = getattr(self._local, "request", None)
+        if request is None:
+            return None
+        self._local.request = None
+        request["ms"] = (time.perf_counter() - self._local.started) * 1000
+        request.update(fields)
+        if self._local.profile is not None:
+            request["profile"] = self._local.profile.stop()
+            self._local.profile = None
+        self.count(f"request.{request['name']}")
+        with self._lock:
+            self.requests.append(request)
+        if self.jsonl_path:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({k: v for k, v in request.items() if k != "profile"}) + "\n")
+        return request
+
+    def recent(self, n=HISTORY):
+        with self._lock:
+            return list(self.requests)[-n:]
+
+    @staticmethod
+    def breakdown(request):
+        # Milliseconds per stage name for one request, summing repeated stages
+        totals = {}
+        for stage in request["stages"]:
+            totals[stage["stage"]] = round(totals.get(stage["stage"], 0.0) + stage["ms"], 3)
+        return totals
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "stages": {name: {"count": count, "total_ms": total * 1000, "mean_ms": total * 1000 / count}
+                           for name, (count, total) in self._stages.items()},
+                "counters": dict(self._counters),
+            }
+
+    def prometheus(self, prefix="emotion_recommender"):
+        # Prometheus text exposition format
+        with self._lock:
+            stages = dict(self._stages)
+            counters = dict(self._counters)
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        for name, (count, total) in sorted(stages.items()):
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+        lines.append(f"# TYPE {prefix}_counter_total counter")
+        for name, value in sorted(counters.items()):
+            lines.append(f'{prefix}_counter_total{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self.requests.clear()
+            self.events.clear()
+
+
+# Shared by the recommender, the app and any script in this process
+tracer = Tracer()
@@ -1,13 +1,32 @@
 from textblob import TextBlob
 import pandas as pd
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-# Load sample movie data
-df = pd.read_csv('../data/movies.csv')  # Ensure the file exists with review text
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recommender.catalog import iter_catalog
 
-# Let's say there's a 'Review' column
-def get_sentiment(text):
-    blob = TextBlob(str(text))
-    polarity = blob.sentiment.polarity
+# Paths (relative to this folder, as before)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INPUT_CSV = os.path.join(BASE_DIR, "..", "data", "movies.csv")  # Ensure the file exists with review text
+OUTPUT_CSV = os.path.join(BASE_DIR, "sentiment_output.csv")
+CACHE_DB = os.path.join(BASE_DIR, "sentiment_cache.sqlite")
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 900
+
+
+def get_polarity(text):
+    return TextBlob(str(text)).sentiment.polarity
+
+
+def label(polarity):
     if polarity > 0.1:
         return "Positive"
     elif polarity < -0.1:
@@ -15,11 +34,121 @@ def get_sentiment(text):
     else:
         return "Neutral"
 
-# Apply to each review
-df['Sentiment'] = df['Review'].apply(get_sentiment)
 
-# Show some results
-print(df[['Movie_Title', 'Review', 'Sentiment']].head())
+# Let's say there's a 'Review' column
+def get_sentiment(text):
+    return label(get_polarity(text))
+
+
+def score_texts(texts):
+    # Runs in a worker process: TextBlob is pure Python, so processes (not threads) scale
+    return [get_polarity(text) for text in texts]
+
+
+def text_key(text):
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+
+class PolarityCache:
+    """Review-text hash -> polarity, so re-runs skip reviews already scored."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS polarity (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+
+    def get_many(self, keys):
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        for i in range(0, len(unique), _SQL_BATCH):
+            batch = unique[i:i + _SQL_BATCH]
+            query = f"SELECT key, value FROM polarity WHERE key IN ({','.join('?' * len(batch))})"
+            found.update(self.conn.execute(query, batch).fetchall())
+        return found
+
+    def put_many(self, items):
+        self.conn.executemany("INSERT OR REPLACE INTO polarity VALUES (?, ?)", items)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def _split(items, parts):
+    size = max(1, -(-len(items) // parts))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _submit_chunk(pool, cache, chunk, column, workers, scoring):
+    # Score only the reviews the cache has not seen and no earlier chunk is still scoring
+    # (those reach the cache before this chunk is written); returns what the writer needs
+    texts = chunk[column].astype(str).tolist()
+    keys = [text_key(t) for t in texts]
+    known = cache.get_many(keys)
+    missing = list({k: t for k, t in zip(keys, texts) if k not in known and k not in scoring}.items())
+    scoring.update(k for k, _ in missing)
+    futures = [pool.submit(score_texts, [t for _, t in part]) for part in _split(missing, workers)] if missing else []
+    return chunk, keys, known, missing, futures
+
+
+def analyze_file(input_csv, output_csv, cache, column="Review", chunksize=10000, workers=None):
+    workers = workers or os.cpu_count() or 1
+    tmp_output = output_csv + ".tmp"
+    total = scored = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep at most two chunks in flight so memory stays bounded by chunksize
+        in_flight = deque()
+        first = True
+        # Keys submitted for scoring whose chunk has not been written yet
+        scoring = set()
+        # Review dumps are not catalogs: read them untyped so columns like a "PG-13" Rating survive
+        for chunk in iter_catalog(input_csv, chunksize=chunksize, typed=False):
+            in_flight.append(_submit_chunk(pool, cache, chunk, column, workers, scoring))
+            if len(in_flight) < 2:
+                continue
+            total, scored, first = _write_chunk(in_flight.popleft(), cache, scoring, tmp_output, first, total, scored)
+        while in_flight:
+            total, scored, first = _write_chunk(in_flight.popleft(), cache, scoring, tmp_output, first, total, scored)
+
+    if first:
+        # A zero-byte input gives no chunks at all; still replace the output, header only
+        pd.DataFrame(columns=["Sentiment"]).to_csv(tmp_output, index=False)
+    os.replace(tmp_output, output_csv)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️ {total} reviews in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} reviews/s), "
+          f"{scored} scored, {total - scored} reused from cache")
+
+
+def _write_chunk(pending, cache, scoring, tmp_output, first, total, scored):
+    chunk, keys, known, missing, futures = pending
+    polarities = [p for future in futures for p in future.result()]
+    new = [(key, polarity) for (key, _), polarity in zip(missing, polarities)]
+    cache.put_many(new)
+    scoring.difference_update(key for key, _ in new)
+    known.update(new)
+    # Texts an earlier chunk was scoring when this one was read are in the cache by now
+    known.update(cache.get_many([key for key in keys if key not in known]))
+
+    chunk['Sentiment'] = [label(known[key]) for key in keys]
+    if first:
+        # Show some results
+        print(chunk[[c for c in ('Movie_Title', 'Review', 'Sentiment') if c in chunk.columns]].head())
+    chunk.to_csv(tmp_output, mode='w' if first else 'a', header=first, index=False)
+    return total + len(chunk), scored + len(new), False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score review sentiment in parallel, streaming the CSV in chunks.")
+    parser.add_argument("--input", default=INPUT_CSV)
+    parser.add_argument("--output", default=OUTPUT_CSV)
+    parser.add_argument("--column", default="Review", help="Column holding the review text")
+    parser.add_argument("--chunksize", type=int, default=10000, help="Rows read and written per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="Scoring processes (default: all cores)")
+    parser.add_argument("--cache", default=CACHE_DB, help="SQLite polarity cache keyed by review hash")
+    args = parser.parse_args()
 
-# Optional: Save the results
-df.to_csv('sentiment_output.csv', index=False)
+    cache = PolarityCache(args.cache)
+    analyze_file(args.input, args.output, cache, column=args.column,
+                 chunksize=args.chunksize, workers=args.workers)
+    cache.close()
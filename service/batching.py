@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+
+class Overloaded(Exception):
+    """Raised by ``MicroBatcher.submit`` when its queue is full (the caller should shed load)."""
+
+
+class MicroBatcher:
+    """Groups concurrent submissions and runs ``fn(items)`` once per group.
+
+    The first item waits at most ``window`` seconds for company; a batch is
+    cut early at ``max_batch`` items. ``fn`` runs in ``executor`` (a thread or
+    process pool) and must return one result per item, in order. While a batch
+    is running new items keep queueing, so batches grow with load; a result
+    that is an exception instance fails only its own item, and if ``fn``
+    raises, the batch is retried item by item so only the items that fail
+    alone see the error. ``concurrency`` batches may run at once (e.g. one per
+    process in a pool). At most ``max_pending`` items may wait; beyond that
+    ``submit`` raises ``Overloaded``.
+    """
+
+    def __init__(self, name, fn, window=0.003, max_batch=64, max_pending=1024, executor=None, concurrency=1):
+        self.name = name
+        self.fn = fn
+        self.window = window
+        self.max_batch = max_batch
+        self.executor = executor
+        self.concurrency = concurrency
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._tasks = []
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+        self._running = 0
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._run()) for _ in range(self.concurrency)]
+        return self
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise Overloaded(f"{self.name} queue is full")
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        # Counted as running from here, so drain() also waits for a batch still collecting
+        self._running += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            # Take whatever is already queued without waiting, then wait out the window
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            start = time.perf_counter()
+            try:
+                try:
+                    results = await loop.run_in_executor(self.executor, self.fn, items)
+                except Exception as e:
+                    if len(items) == 1:
+                        results = [e]
+                    else:
+                        # One bad item must not fail its neighbours: rerun them one at a time
+                        results = [await self._run_one(loop, item) for item in items]
+                for (_, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+            finally:
+                self._running -= 1
+            self.batches += 1
+            self.items += len(batch)
+            self.largest = max(self.largest, len(batch))
+            self.busy_seconds += time.perf_counter() - start
+
+    async def _run_one(self, loop, item):
+        try:
+            return (await loop.run_in_executor(self.executor, self.fn, [item]))[0]
+        except Exception as e:
+            return e
+
+    async def drain(self, timeout=5.0):
+        # Graceful shutdown: let queued and running batches finish, then stop the workers
+        deadline = time.monotonic() + timeout
+        while (self._running or not self._queue.empty()) and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self):
+        return {
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest,
+            "rejected": self.rejected,
+            "busy_seconds": self.busy_seconds,
+        }
@@ -0,0 +1,212 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.synthetic import make_reviews
+from emotion_detector.synthetic import make_frames
+
+EMOTIONS = ["happy", "sad", "angry", "surprise", "fear", "neutral"]
+ENDPOINTS = ("recommend", "analyze-text", "emotion")
+
+
+def recommend_payloads(seed):
+    # Half single emotions, half DeepFace-style score dicts
+    rng = random.Random(seed)
+    while True:
+        if rng.random() < 0.5:
+            body = {"emotion": rng.choice(EMOTIONS), "top_n": rng.choice([5, 10])}
+        else:
+            body = {"emotion": {emotion: rng.random() * 100 for emotion in EMOTIONS}, "top_n": 5}
+        yield "/recommend", "application/json", json.dumps(body).encode()
+
+
+def text_payloads(seed):
+    reviews = make_reviews(500, seed=seed)
+    for i in range(sys.maxsize):
+        yield "/analyze-text", "application/json", json.dumps({"text": reviews[i % len(reviews)]}).encode()
+
+
+def image_payloads(seed, image=None):
+    if image:
+        with open(image, "rb") as f:
+            images = [f.read()]
+    else:
+        import cv2
+        images = [cv2.imencode(".jpg", frame)[1].tobytes() for frame in make_frames(8, seed=seed)]
+    for i in range(sys.maxsize):
+        yield "/emotion", "image/jpeg", images[i % len(images)]
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length") or 0))
+    return status, headers, body
+
+
+class Client:
+    """One connection, one request at a time; reconnects when the server closes."""
+
+    def __init__(self, host, port, keep_alive=True):
+        self.host = host
+        self.port = port
+        self.keep_alive = keep_alive
+        self.reader = self.writer = None
+        self.connects = 0
+
+    async def request(self, method, path, content_type=None, body=b""):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.connects += 1
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}", f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if self.keep_alive else 'close'}"]
+        if content_type:
+            lines.append(f"Content-Type: {content_type}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        try:
+            await self.writer.drain()
+            status, headers, body = await read_response(self.reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            await self.close()
+            raise
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, body
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self.reader = self.writer = None
+
+
+async def _worker(client, payloads, deadline, remaining, latencies, statuses):
+    while time.perf_counter() < deadline and remaining[0] > 0:
+        remaining[0] -= 1
+        path, content_type, body = next(payloads)
+        start = time.perf_counter()
+        try:
+            status, _ = await client.request("POST", path, content_type, body)
+        except ConnectionRefusedError:
+            # The server has shut down
+            statuses["refused"] = statuses.get("refused", 0) + 1
+            break
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            statuses["connection_error"] = statuses.get("connection_error", 0) + 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+    await client.close()
+
+
+async def run_load(url, endpoint="recommend", concurrency=32, duration=10.0, requests=None,
+                   keep_alive=True, image=None, seed=0):
+    address = urlsplit(url)
+    host, port = address.hostname, address.port or 80
+    payloads = {"recommend": recommend_payloads, "analyze-text": text_payloads,
+                "emotion": lambda seed: image_payloads(seed, image)}[endpoint]
+
+    # Wait for the server, then a short warm-up so the first batches don't skew p99
+    warmup = Client(host, port)
+    for _ in range(50):
+        try:
+            await warmup.request("GET", "/health")
+            break
+        except OSError:
+            await asyncio.sleep(0.2)
+    warm = payloads(seed)
+    for _ in range(5):
+        await warmup.request("POST", *next(warm))
+    # Its connection would idle past the keep-alive timeout during the run
+    await warmup.close()
+
+    latencies, statuses = [], {}
+    remaining = [requests or sys.maxsize]
+    clients = [Client(host, port, keep_alive) for _ in range(concurrency)]
+    start = time.perf_counter()
+    deadline = start + duration if requests is None else float("inf")
+    await asyncio.gather(*(_worker(client, payloads(seed + i), deadline, remaining, latencies, statuses)
+                           for i, client in enumerate(clients)))
+    elapsed = time.perf_counter() - start
+
+    try:
+        _, health = await warmup.request("GET", "/health")
+        await warmup.close()
+    except OSError:
+        # The server was stopped mid-run
+        health = b"{}"
+    ms = np.array(latencies) * 1000
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "keep_alive": keep_alive,
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "ok": statuses.get(200, 0),
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "connections": sum(client.connects for client in clients),
+        "latency_ms": {
+            "p50": float(np.percentile(ms, 50)) if ms.size else None,
+            "p90": float(np.percentile(ms, 90)) if ms.size else None,
+            "p99": float(np.percentile(ms, 99)) if ms.size else None,
+            "max": float(ms.max()) if ms.size else None,
+        },
+        "server": json.loads(health),
+    }
+
+
+def print_report(report):
+    latency = report["latency_ms"]
+    batcher = report["server"].get("batchers", {}).get({"analyze-text": "sentiment"}.get(report["endpoint"],
+                                                                                   report["endpoint"]), {})
+    print(f"📊 {report['endpoint']}: {report['requests']} requests in {report['seconds']:.1f}s "
+          f"with {report['concurrency']} clients ({report['connections']} connections)")
+    print(f"⚡ {report['rps']:.0f} req/s   p50 {latency['p50']:.1f} ms   p90 {latency['p90']:.1f} ms   "
+          f"p99 {latency['p99']:.1f} ms   max {latency['max']:.1f} ms")
+    print(f"📦 mean batch {batcher.get('mean_batch', 0):.1f}, largest {batcher.get('largest_batch', 0)}, "
+          f"rejected {batcher.get('rejected', 0)}")
+    errors = {status: count for status, count in report["statuses"].items() if status != "200"}
+    if errors:
+        print(f"⚠️ Non-200 responses: {errors}")
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Closed-loop load generator for service.server")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="recommend")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients, one connection each")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests instead of --duration")
+    parser.add_argument("--no-keepalive", action="store_true", help="Open a new connection per request")
+    parser.add_argument("--image", help="Image to post to /emotion (default: synthetic frames)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = asyncio.run(run_load(args.url, args.endpoint, args.concurrency, args.duration, args.requests,
+                                  keep_alive=not args.no_keepalive, image=args.image))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.json}")
@@ -0,0 +1,420 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recommender.tracing import tracer
+from service.batching import MicroBatcher, Overloaded
+
+# Request limits
+MAX_HEADER = 16 * 1024
+MAX_BODY = 8 * 1024 * 1024
+MAX_TOP_N = 50
+# Seconds an idle keep-alive connection stays open, and the grace period on shutdown
+KEEPALIVE_TIMEOUT = 5.0
+SHUTDOWN_GRACE = 10.0
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "version", "headers", "body")
+
+    def __init__(self, method, target, version, headers, body):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path
+        self.query = parse_qs(url.query)
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def json(self):
+        try:
+            payload = json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        return payload
+
+
+async def read_request(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    if "chunked" in headers.get("transfer-encoding", ""):
+        raise HTTPError(411, "Chunked bodies are not supported; send Content-Length")
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY:
+        raise HTTPError(413, f"Body exceeds {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method, target, version, headers, body)
+
+
+def encode_response(status, body, content_type="application/json", keep_alive=True, headers=None):
+    if not isinstance(body, bytes):
+        body = json.dumps(body, default=_json_default).encode()
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+             f"Content-Type: {content_type}",
+             f"Content-Length: {len(body)}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if keep_alive:
+        lines.append(f"Keep-Alive: timeout={int(KEEPALIVE_TIMEOUT)}")
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def _records(frame):
+    # DataFrame rows as plain dicts; missing values become null and float32 ratings stay 8.8
+    return json.loads(frame.to_json(orient="records", force_ascii=False, double_precision=6))
+
+
+# Batch functions: each takes the queued items and returns one result (or exception) per item
+
+def recommend_batch(items):
+    from recommender.recommend import recommend_movies_batch
+    with tracer.stage("service.batch.recommend"):
+        batch = recommend_movies_batch([item["emotion"] for item in items],
+                                       top_n=[item["top_n"] for item in items],
+                                       exclude=[item["exclude"] for item in items])
+        # Serialise each distinct movie once for the whole batch, not once per query
+        unique, position = np.unique(batch.rows, return_inverse=True)
+        movies = _records(batch.index.results.iloc[unique])
+        scores = np.round(batch.scores.astype(np.float64), 6).tolist()
+        results = [[dict(movies[position[j]], score=scores[j]) for j in range(start, end)]
+                   for start, end in zip(batch.offsets[:-1], batch.offsets[1:])]
+    tracer.count("service.batch.recommend.items", len(items))
+    return results
+
+
+def sentiment_batch(texts):
+    # Also runs in worker processes, so it only uses picklable, importable pieces
+    from sentiment_analysis.analyze_movies import score_texts, label
+    return [{"polarity": polarity, "sentiment": label(polarity)} for polarity in score_texts(texts)]
+
+
+class EmotionBatch:
+    # Decodes images and runs the emotion model once per batch; the model loads on first use
+    def __init__(self):
+        self.model = None
+
+    def __call__(self, images):
+        import cv2
+        if self.model is None:
+            from emotion_detector.batch import BatchEmotionModel
+            self.model = BatchEmotionModel()
+        with tracer.stage("service.batch.emotion"):
+            frames = [cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) for data in images]
+            decoded = [i for i, frame in enumerate(frames) if frame is not None]
+            results = [HTTPError(400, "Body is not a decodable image") for _ in images]
+            for i, result in zip(decoded, self.model.analyze([frames[i] for i in decoded])):
+                results[i] = result[0]
+        tracer.count("service.batch.emotion.items", len(images))
+        return results
+
+
+def _recommend_item(payload, n_movies):
+    emotion = payload.get("emotion")
+    if isinstance(emotion, dict):
+        if not all(isinstance(score, (int, float)) for score in emotion.values()):
+            raise HTTPError(400, "Emotion scores must be numbers")
+    elif not isinstance(emotion, str):
+        raise HTTPError(400, "'emotion' must be a name or a {emotion: score} object")
+    top_n = payload.get("top_n", 5)
+    if not isinstance(top_n, int) or not 1 <= top_n <= MAX_TOP_N:
+        raise HTTPError(400, f"'top_n' must be an integer from 1 to {MAX_TOP_N}")
+    exclude = payload.get("exclude") or []
+    if not isinstance(exclude, list):
+        raise HTTPError(400, "'exclude' must be a list of titles or row ids")
+    for movie in exclude:
+        # bool is an int subclass, but True is not a row id
+        if isinstance(movie, str):
+            continue
+        if not isinstance(movie, int) or isinstance(movie, bool) or not 0 <= movie < n_movies:
+            raise HTTPError(400, f"'exclude' entries must be titles or row ids from 0 to {n_movies - 1}")
+    return {"emotion": emotion, "top_n": top_n, "exclude": exclude}
+
+
+class RecommendationServer:
+    """HTTP/1.1 front end that feeds the recommender and models through micro-batchers.
+
+    Plain asyncio streams, no framework. Connections are kept alive between
+    requests (closed after ``keepalive_timeout`` idle seconds). Load is shed with
+    ``503`` and ``Retry-After`` when a batch queue or the connection limit is
+    full. On SIGINT/SIGTERM the listener closes, idle connections are dropped,
+    in-flight requests finish (up to ``grace`` seconds) and queued batches drain.
+    """
+
+    def __init__(self, window=0.003, max_batch=64, max_pending=1024, max_connections=1024,
+                 sentiment_workers=1, keepalive_timeout=KEEPALIVE_TIMEOUT, grace=SHUTDOWN_GRACE):
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.max_connections = max_connections
+        self.sentiment_workers = sentiment_workers
+        self.keepalive_timeout = keepalive_timeout
+        self.grace = grace
+        self.closing = False
+        self.in_flight = 0
+        self.started = time.time()
+        self.n_movies = 0
+        # Connection task -> True while it is handling a request
+        self._connections = {}
+        self._executors = []
+        self.batchers = {}
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+            ("POST", "/recommend"): self.recommend,
+            ("POST", "/emotion"): self.emotion,
+            ("POST", "/analyze-text"): self.analyze_text,
+        }
+
+    def _executor(self, executor):
+        self._executors.append(executor)
+        return executor
+
+    def _batcher(self, name, fn, executor, concurrency=1):
+        batcher = MicroBatcher(name, fn, window=self.window, max_batch=self.max_batch,
+                               max_pending=self.max_pending, executor=executor, concurrency=concurrency)
+        self.batchers[name] = batcher.start()
+
+    async def start(self, host, port):
+        loop = asyncio.get_running_loop()
+        # Load the index and TextBlob before listening; the emotion model loads on its first batch
+        from recommender.recommend import get_index
+        index = await loop.run_in_executor(None, get_index)
+        # Row ids in 'exclude' are checked against this; the catalog only grows
+        self.n_movies = len(index.df)
+        await loop.run_in_executor(None, sentiment_batch, ["warm up"])
+
+        # One thread each for the recommender and the emotion model, so batches grow under load
+        self._batcher("recommend", recommend_batch, self._executor(ThreadPoolExecutor(1, "recommend")))
+        self._batcher("emotion", EmotionBatch(), self._executor(ThreadPoolExecutor(1, "emotion")))
+        # TextBlob is pure Python: with more than one worker, score batches in processes
+        if self.sentiment_workers > 1:
+            pool = self._executor(ProcessPoolExecutor(self.sentiment_workers))
+        else:
+            pool = self._executor(ThreadPoolExecutor(1, "sentiment"))
+        self._batcher("sentiment", sentiment_batch, pool, concurrency=self.sentiment_workers)
+
+        self.server = await asyncio.start_server(self._handle, host, port, limit=MAX_HEADER)
+        tracer.event("service.started", host=host, port=port, window_ms=self.window * 1000,
+                     max_batch=self.max_batch)
+        return self.server
+
+    async def _handle(self, reader, writer):
+        if self.closing or len(self._connections) >= self.max_connections:
+            writer.write(encode_response(503, {"error": "Too many connections"}, keep_alive=False,
+                                         headers={"Retry-After": "1"}))
+            await _close(writer)
+            return
+        task = asyncio.current_task()
+        self._connections[task] = False
+        try:
+            while not self.closing:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), self.keepalive_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(encode_response(413, {"error": "Headers too large"}, keep_alive=False))
+                    break
+                except HTTPError as e:
+                    writer.write(encode_response(e.status, {"error": str(e)}, keep_alive=False))
+                    break
+                except ValueError:
+                    writer.write(encode_response(400, {"error": "Malformed request"}, keep_alive=False))
+                    break
+
+                self._connections[task] = True
+                self.in_flight += 1
+                try:
+                    status, body, content_type, headers = await self.dispatch(request)
+                finally:
+                    self.in_flight -= 1
+                    self._connections[task] = False
+                keep_alive = request.keep_alive and not self.closing
+                writer.write(encode_response(status, body, content_type, keep_alive, headers))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            await _close(writer)
+
+    async def dispatch(self, request):
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            known = any(path == request.path for _, path in self.routes)
+            return (405 if known else 404), {"error": f"No route for {request.method} {request.path}"}, \
+                "application/json", None
+        tracer.count(f"service.requests.{request.path.strip('/')}")
+        start = time.perf_counter()
+        try:
+            body, content_type = await handler(request)
+            tracer.observe(f"service{request.path}", time.perf_counter() - start)
+            return 200, body, content_type, None
+        except Overloaded as e:
+            tracer.count("service.rejected")
+            return 503, {"error": str(e)}, "application/json", {"Retry-After": "1"}
+        except HTTPError as e:
+            return e.status, {"error": str(e)}, "application/json", e.headers
+        except ImportError as e:
+            # e.g. DeepFace is not installed: the other endpoints keep working
+            return 503, {"error": f"Backend unavailable: {e}"}, "application/json", None
+        except Exception as e:
+            tracer.event("service.error", level=logging.ERROR, path=request.path, error=repr(e))
+            return 500, {"error": str(e) or type(e).__name__}, "application/json", None
+
+    async def recommend(self, request):
+        item = _recommend_item(request.json(), self.n_movies)
+        movies = await self.batchers["recommend"].submit(item)
+        return {"emotion": item["emotion"], "movies": movies}, "application/json"
+
+    async def emotion(self, request):
+        # Raw image bytes (JPEG, PNG, ...); ?top_n=5 also recommends for the detected scores
+        if not request.body:
+            raise HTTPError(400, "Send the image as the request body")
+        result = await self.batchers["emotion"].submit(request.body)
+        if "top_n" in request.query:
+            top_n = request.query["top_n"][0]
+            item = _recommend_item({"emotion": result["emotion"], "top_n": int(top_n) if top_n.isdigit() else top_n},
+                                   self.n_movies)
+            result = dict(result, movies=await self.batchers["recommend"].submit(item))
+        return result, "application/json"
+
+    async def analyze_text(self, request):
+        text = request.json().get("text")
+        if not isinstance(text, str):
+            raise HTTPError(400, "'text' must be a string")
+        return await self.batchers["sentiment"].submit(text), "application/json"
+
+    async def health(self, request):
+        return {
+            "status": "draining" if self.closing else "ok",
+            "uptime_seconds": time.time() - self.started,
+            "connections": len(self._connections),
+            "in_flight": self.in_flight,
+            "batchers": {name: batcher.stats() for name, batcher in self.batchers.items()},
+        }, "application/json"
+
+    async def metrics(self, request):
+        lines = ["# TYPE emotion_recommender_batch_items_total counter"]
+        for name, batcher in self.batchers.items():
+            stats = batcher.stats()
+            lines.append(f'emotion_recommender_batch_items_total{{batcher="{name}"}} {stats["items"]}')
+            lines.append(f'emotion_recommender_batches_total{{batcher="{name}"}} {stats["batches"]}')
+            lines.append(f'emotion_recommender_batch_rejected_total{{batcher="{name}"}} {stats["rejected"]}')
+            lines.append(f'emotion_recommender_batch_pending{{batcher="{name}"}} {stats["pending"]}')
+        body = tracer.prometheus() + "\n".join(lines) + "\n"
+        return body.encode(), "text/plain; version=0.0.4"
+
+    async def shutdown(self):
+        self.closing = True
+        self.server.close()
+        # Idle keep-alive connections are just waiting to read: drop them now
+        for task, busy in list(self._connections.items()):
+            if not busy:
+                task.cancel()
+        deadline = time.monotonic() + self.grace
+        while self._connections and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for batcher in self.batchers.values():
+            await batcher.drain(timeout=max(deadline - time.monotonic(), 0))
+        for task in list(self._connections):
+            task.cancel()
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        tracer.event("service.stopped", dropped=len(self._connections))
+
+
+async def _close(writer):
+    try:
+        writer.close()
+        await writer.wait_closed()
+    except (ConnectionError, OSError):
+        pass
+
+
+async def serve(host, port, **options):
+    server = RecommendationServer(**options)
+    await server.start(host, port)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    print(f"🚀 Serving on http://{host}:{port} (batch window {server.window * 1000:g} ms)")
+    await stop.wait()
+    print("🛑 Shutting down: draining in-flight requests...")
+    await server.shutdown()
+    print("✅ Stopped")
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="HTTP service for recommendations, emotion detection and sentiment")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--window-ms", type=float, default=3.0, help="How long a batch waits to fill up")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-pending", type=int, default=1024,
+                        help="Queued items per endpoint before answering 503")
+    parser.add_argument("--max-connections", type=int, default=1024)
+    parser.add_argument("--sentiment-workers", type=int, default=1,
+                        help="Processes scoring sentiment batches (1 = a thread in this process)")
+    parser.add_argument("--keepalive", type=float, default=KEEPALIVE_TIMEOUT, help="Idle keep-alive timeout (s)")
+    parser.add_argument("--grace", type=float, default=SHUTDOWN_GRACE, help="Shutdown grace period (s)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = _parse_args()
+    asyncio.run(serve(args.host, args.port, window=args.window_ms / 1000, max_batch=args.max_batch,
+                      max_pending=args.max_pending, max_connections=args.max_connections,
+                      sentiment_workers=args.sentiment_workers, keepalive_timeout=args.keepalive,
+                      grace=args.grace))
@@ -0,0 +1,95 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.synthetic import make_catalog
+from recommender import recommend
+from recommender.catalog import lower_categories
+from recommender.genre_index import GenreIndex
+from recommender.index import MovieIndex
+
+
+def _catalog(df):
+    df = df.reset_index(drop=True)
+    df["Genre"] = lower_categories(df["Genre"].astype("category"))
+    return df
+
+
+def _changes(df, n_edits, n_new):
+    # Edits take another movie's genre and description; new titles copy existing ones, so
+    # the fitted vocabulary still covers every word and a refit would keep the same terms
+    rng = np.random.default_rng(1)
+    edits = df.iloc[rng.choice(len(df), n_edits, replace=False)].astype({"Genre": str})
+    donors = df.iloc[rng.choice(len(df), n_edits + n_new)].astype({"Genre": str})
+    edits["Genre"] = donors["Genre"].to_numpy()[:n_edits]
+    edits["Description"] = donors["Description"].to_numpy()[:n_edits]
+    new = donors.iloc[n_edits:].copy()
+    new["Movie_Title"] = [f"New title {i}" for i in range(n_new)]
+    return pd.concat([edits, new], ignore_index=True)
+
+
+def _apply(df, movies):
+    # The catalog a full rebuild would see: edits in place, new titles appended
+    final = df.astype({"Genre": str}).set_index("Movie_Title")
+    final.update(movies.set_index("Movie_Title"))
+    new = movies[~movies["Movie_Title"].isin(final.index)]
+    return _catalog(pd.concat([final.reset_index(), new], ignore_index=True))
+
+
+def _assert_same_rankings(index, rebuilt):
+    assert list(index.df["Movie_Title"]) == list(rebuilt.df["Movie_Title"])
+    for emotion in rebuilt.rankings:
+        assert np.array_equal(index.rankings[emotion], rebuilt.rankings[emotion]), emotion
+    assert np.allclose(index.affinity, rebuilt.affinity, atol=1e-6)
+
+
+def test_upsert_ranks_like_a_rebuild_with_the_fitted_vocabulary():
+    df = _catalog(make_catalog(400, seed=2))
+    index = MovieIndex.build(df, recommend.emotion_genre_map)
+    movies = _changes(df, n_edits=10, n_new=10)
+    index.upsert(movies.copy(), recommend.emotion_genre_map)
+    assert index.stale_rows == 20
+
+    final = _apply(df, movies)
+    rebuilt = MovieIndex(final, index.tfidf.transform(final["Description"]), GenreIndex(final["Genre"]), {}, {},
+                         tfidf=index.tfidf)
+    rebuilt._build_rankings(recommend.emotion_genre_map)
+    _assert_same_rankings(index, rebuilt)
+
+
+def test_upsert_with_idf_refresh_ranks_like_a_full_rebuild():
+    df = _catalog(make_catalog(400, seed=2))
+    index = MovieIndex.build(df, recommend.emotion_genre_map)
+    movies = _changes(df, n_edits=30, n_new=20)
+    index.upsert(movies.copy(), recommend.emotion_genre_map)
+    # 50 of 420 rows is past IDF_REFRESH_FRACTION, so the weights were re-derived
+    assert index.stale_rows == 0
+
+    rebuilt = MovieIndex.build(_apply(df, movies), recommend.emotion_genre_map)
+    _assert_same_rankings(index, rebuilt)
+
+
+def test_ingest_movies_saves_an_index_other_processes_load(tmp_path, monkeypatch):
+    catalog = tmp_path / "movies.csv"
+    shutil.copy(recommend.CATALOG_PATH, catalog)
+    monkeypatch.setattr(recommend, "CATALOG_PATH", str(catalog))
+    monkeypatch.setattr(recommend, "INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(recommend, "_index", None)
+
+    df = pd.read_csv(catalog)
+    movies = pd.concat([df.head(1).assign(Genre="Horror"), df.head(1).assign(Movie_Title="Brand New")])
+    edit_rows, new_rows = recommend.ingest_movies(movies)
+    assert list(edit_rows) == [0] and list(new_rows) == [len(df)]
+    ingested = recommend.get_index()
+
+    # A fresh process: nothing in memory, so the saved artifact must be current
+    monkeypatch.setattr(recommend, "_index", None)
+    loaded = recommend.get_index()
+    assert loaded is not ingested and loaded.path == recommend.INDEX_DIR
+    assert len(pd.read_csv(catalog)) == len(df) + 1
+    _assert_same_rankings(loaded, ingested)
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recommender.recommend import emotion_genre_map, recommend_movies, recommend_movies_batch
+
+
+@pytest.mark.parametrize("top_n", [1, 5, 50])
+@pytest.mark.parametrize("emotion", list(emotion_genre_map))
+def test_single_and_batch_recommendations_agree(emotion, top_n):
+    single = recommend_movies(emotion, top_n)
+    batch = recommend_movies_batch([emotion], top_n=top_n).frame(0)
+    assert list(single.index) == list(batch.index)
+
+
+@pytest.mark.parametrize("exclude", [["Her"], "Her", [[10 ** 6]], [[-1]], [[True]], [3]])
+def test_batch_rejects_malformed_exclusions(exclude):
+    with pytest.raises(ValueError):
+        recommend_movies_batch(["happy"], exclude=exclude)
+
+
+def test_batch_exclusions_by_title_and_row():
+    top = recommend_movies_batch(["happy"], top_n=2).frame(0)
+    by_title = recommend_movies_batch(["happy"], top_n=2, exclude=[[top["Movie_Title"].iloc[0]]]).frame(0)
+    by_row = recommend_movies_batch(["happy"], top_n=2, exclude=[[int(top.index[0])]]).frame(0)
+    assert top.index[0] not in by_title.index
+    assert list(by_title.index) == list(by_row.index)
@@ -0,0 +1,59 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.synthetic import make_catalog
+from recommender.batch import emotion_weights, recommend_batch
+from recommender.catalog import lower_categories
+from recommender.index import MovieIndex
+from recommender.recommend import emotion_genre_map, get_index
+from recommender.sharded import ShardedRecommender, save_shards
+
+EMOTIONS = list(emotion_genre_map)
+
+
+@pytest.fixture(scope="module", params=["catalog", "synthetic"])
+def index(request):
+    # The real catalog has many exactly tied scores; the synthetic one spreads over more rows
+    if request.param == "catalog":
+        return get_index()
+    df = make_catalog(600, seed=3)
+    df["Genre"] = lower_categories(df["Genre"].astype("category"))
+    return MovieIndex.build(df, emotion_genre_map, signature="test")
+
+
+@pytest.fixture(scope="module", params=["rows", "genre"])
+def sharded(request, index, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("shards") / request.param)
+    save_shards(index, path, 3, request.param)
+    with ShardedRecommender(path, workers=2) as recommender:
+        yield recommender
+
+
+def _queries():
+    rng = np.random.default_rng(0)
+    blends = [{emotion: float(rng.random() * 100) for emotion in EMOTIONS} for _ in range(6)]
+    return EMOTIONS + ["disgust"] + blends
+
+
+def test_sharded_top_matches_index(index, sharded):
+    for emotion in EMOTIONS:
+        assert list(sharded.top(emotion, 25).index) == list(index.top(emotion, 25).index), emotion
+
+
+def test_sharded_top_blended_matches_index(index, sharded):
+    for weights in emotion_weights(_queries()[len(EMOTIONS) + 1:], index.emotions):
+        assert list(sharded.top_blended(weights, 10).index) == list(index.top_blended(weights, 10).index)
+
+
+def test_sharded_recommend_batch_matches_index(index, sharded):
+    queries = _queries()
+    n_rows = len(index.df)
+    exclude = [[index.df["Movie_Title"].iat[i % n_rows], (i + 5) % n_rows] for i in range(len(queries))]
+    expected = recommend_batch(index, queries, top_n=10, exclude=exclude)
+    got = sharded.recommend_batch(queries, top_n=10, exclude=exclude)
+    for i in range(len(queries)):
+        assert list(got[i].index) == list(expected.frame(i).index), queries[i]
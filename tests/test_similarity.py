@@ -0,0 +1,54 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.synthetic import make_catalog
+from recommender.catalog import lower_categories
+from recommender.index import MovieIndex
+from recommender.recommend import emotion_genre_map, get_index
+from recommender.similarity import normalize_rows, recall_at_k
+
+
+@pytest.fixture(scope="module")
+def synthetic_index():
+    df = make_catalog(3000, seed=1)
+    df["Genre"] = lower_categories(df["Genre"].astype("category"))
+    return MovieIndex.build(df, emotion_genre_map)
+
+
+def _search(index, backend, queries, k, allowed=None, **params):
+    return index.similarity_backend(backend, **params).search(queries, k, allowed)
+
+
+def test_ivf_matches_exact_on_test_catalog():
+    # Few enough rows that the default probe covers every list: no approximation left
+    index = get_index()
+    queries = normalize_rows(index.tfidf_matrix)
+    ivf_rows, ivf_scores = _search(index, "ivf", queries, 5)
+    exact_rows, exact_scores = _search(index, "exact", queries, 5)
+    assert np.array_equal(ivf_rows, exact_rows)
+    assert np.allclose(ivf_scores, exact_scores)
+
+
+def test_ivf_genre_filter_matches_exact_on_test_catalog():
+    index = get_index()
+    centroids, members = index.emotion_centroids()
+    queries = normalize_rows(centroids)
+    ivf_rows, _ = _search(index, "ivf", queries, 10, members)
+    exact_rows, _ = _search(index, "exact", queries, 10, members)
+    assert np.array_equal(ivf_rows, exact_rows)
+
+
+def test_ivf_recall_grows_with_probes(synthetic_index):
+    sample = np.random.default_rng(0).choice(synthetic_index.tfidf_matrix.shape[0], 200, replace=False)
+    queries = normalize_rows(synthetic_index.tfidf_matrix[sample])
+    exact_rows, _ = _search(synthetic_index, "exact", queries, 10)
+    n_lists = synthetic_index.similarity_backend("ivf").n_lists
+    recalls = [recall_at_k(_search(synthetic_index, "ivf", queries, 10, n_probe=n_probe)[0], exact_rows, 10)
+               for n_probe in (1, 4, 8, n_lists)]
+    assert recalls == sorted(recalls)
+    assert recalls[2] >= 0.75
+    assert recalls[-1] == 1.0